@@ -0,0 +1,74 @@
+import random
+
+from symmetry import canonical_key
+from zobrist import TranspositionTable
+
+# Evaluations shared by every search bot and analysis call in this process
+SHARED_TABLE = TranspositionTable(bits=18)
+
+
+def rollout_move(engine, rng):
+    """ Return a random move that keeps the mover on the board if the first
+        few tries find one, otherwise any random move. """
+
+    moves = engine.legal_moves()
+    for _ in range(4):
+        move = rng.choice(moves)
+        if not engine.suicidal(move):
+            return move
+    return rng.choice(moves)
+
+
+def rewards(engine, last_out):
+    """ Return the reward of every seat in a finished game: 1 for the winner,
+        a tie splits 1 between the seats that went out together (or the ones
+        still standing when nobody can play). """
+
+    reward = [0.0] * engine.num_players()
+    winner = engine.winner()
+    if winner is not None:
+        reward[winner] = 1.0
+        return reward
+    shared = [seat for seat in range(engine.num_players())
+        if engine.still_in(seat)] or last_out
+    for seat in shared:
+        reward[seat] = 1.0 / len(shared)
+    return reward
+
+
+def rollout(engine, rng):
+    """ Play a copy of the position to the end, return every seat's reward. """
+
+    state = engine.copy(random.Random(rng.getrandbits(64)))
+    last_out = []
+    while not state.is_terminal():
+        last_out = state.apply_move(rollout_move(state, rng))
+    return rewards(state, last_out)
+
+
+def evaluate(engine, rollouts=200, table=SHARED_TABLE, rng=None):
+    """ Return each seat's expected reward from the position, estimated from
+        at least the given number of rollouts. Results are kept in the table
+        by symmetry canonical key and game with the rollout count as depth,
+        so asking again (or about a rotated or mirrored position) only plays
+        the rollouts still missing. """
+
+    rng = rng if rng is not None else random.Random()
+    key = canonical_key(engine)[0]
+    # The table is shared by every tile set, board size and player count
+    game = (engine.catalogue().digest, engine.size(), engine.num_players())
+    depth = 0
+    totals = [0.0] * engine.num_players()
+    entry = table.lookup(key, game) if table is not None else None
+    if entry is not None:
+        depth, stored = entry
+        totals = list(stored)
+
+    for _ in range(rollouts - depth):
+        for seat, value in enumerate(rollout(engine, rng)):
+            totals[seat] += value
+    depth = max(depth, rollouts)
+
+    if table is not None and depth:
+        table.store(key, depth, totals, game)
+    return [total / depth for total in totals] if depth else totals
@@ -1,5 +1,8 @@
+import bisect
+
 import arcade
 import arcade.color
+import arcade.key
 
 # Simple mouse event object compatible with classes.py expectations
 class _MouseEvent:
@@ -19,6 +22,29 @@ class _MouseEvent:
         self._x = x
         self._y = y
 
+# Key names ('Z', 'ESCAPE', ...) by arcade key constant; for aliases the
+# first name arcade defines wins
+_KEY_NAMES = {}
+for _name, _value in vars(arcade.key).items():
+    if _name.isupper() and not _name.startswith('MOD_'):
+        _KEY_NAMES.setdefault(_value, _name)
+
+# Key press event object, the keyboard counterpart of _MouseEvent
+class _KeyEvent:
+    def __init__(self, symbol, modifiers):
+        self._symbol = symbol
+        self._modifiers = modifiers
+
+    def get_key(self):
+        return _KEY_NAMES.get(self._symbol, str(self._symbol))
+
+    def control_down(self):
+        # Command on macOS counts as control
+        return bool(self._modifiers & (arcade.key.MOD_CTRL | arcade.key.MOD_COMMAND))
+
+    def shift_down(self):
+        return bool(self._modifiers & arcade.key.MOD_SHIFT)
+
 def _resolve_color(color):
     """Resolve a color name or tuple used in the original code into an
     arcade color. Accepts '', color name string, or an (r,g,b) tuple.
@@ -64,6 +90,87 @@ def _map_button(button):
     # Fallback to string conversion
     return str(button)
 
+# Textures already loaded, by image path, shared by every window and game
+_textures = {}
+
+
+def load_texture(path):
+    """Return the texture of an image file, reading the file only the first
+    time. Images are hit-tested by their box, so no hit box outline is traced
+    from the pixels.
+    """
+    if path not in _textures:
+        _textures[path] = arcade.load_texture(path, hit_box_algorithm="None")
+    return _textures[path]
+
+
+# Side in pixels of the grid cells used to find the shapes under the mouse
+_GRID = 100
+
+
+class _DrawList(list):
+    """Batch of shapes that are still drawn one call at a time."""
+
+    def draw(self):
+        for shape in self:
+            shape.draw()
+
+
+def _new_batch(kind):
+    if kind == 'elements':
+        return arcade.ShapeElementList()
+    if kind == 'sprites':
+        return arcade.SpriteList()
+    return _DrawList()
+
+
+class _Layer:
+    """The shapes of one depth in the order they were added. Consecutive
+    shapes of the same kind share one batch (a ShapeElementList for plain
+    shapes, a SpriteList for images), which is kept between frames and only
+    rebuilt after one of its shapes is added, removed or restyled. Shapes
+    parked outside the window are left out of the batches.
+    """
+
+    def __init__(self):
+        self.shapes = []
+        self._orders = []
+        self._batches = None
+
+    def add(self, shape, order):
+        index = bisect.bisect(self._orders, order)
+        self._orders.insert(index, order)
+        self.shapes.insert(index, shape)
+        self.invalidate()
+
+    def remove(self, shape):
+        index = next(i for i, s in enumerate(self.shapes) if s is shape)
+        del self._orders[index]
+        del self.shapes[index]
+        self.invalidate()
+
+    def invalidate(self):
+        if self._batches is not None:
+            # Sprites remember the lists they are in; let go of the old ones
+            for batch in self._batches:
+                if isinstance(batch, arcade.SpriteList):
+                    batch.clear()
+        self._batches = None
+
+    def draw(self):
+        if self._batches is None:
+            self._batches = []
+            kind = None
+            for shape in self.shapes:
+                if not shape.on_screen():
+                    continue
+                if shape.batch_kind != kind:
+                    kind = shape.batch_kind
+                    self._batches.append(_new_batch(kind))
+                shape.add_to_batch(self._batches[-1])
+        for batch in self._batches:
+            batch.draw()
+
 class Window(arcade.Window):
     def __init__(self, width=400, height=400, background="white", title="Graphics Window", first_function=None):
         super().__init__(width, height, title)
@@ -71,27 +178,127 @@ class Window(arcade.Window):
         self.first_function = first_function
         # shapes holds all drawable objects
         self.shapes = []
-        # handlers holds tuples (shape, handler) registered via shape.add_handler
-        self.handlers = []
+        # _layers maps each depth in use to its _Layer; _orders gives every
+        # added shape its insertion number, which orders shapes of one depth
+        self._layers = {}
+        # _depths holds the negated depths in use, kept sorted so layers are
+        # drawn without sorting each frame
+        self._depths = []
+        self._orders = {}
+        self._next_order = 0
+        # handlers maps a shape to the handlers registered via shape.add_handler
+        self.handlers = {}
+        # key_handlers get every key press, see add_key_handler
+        self.key_handlers = []
+        # _grid maps a (column, row) grid cell of the window to the added
+        # shapes whose bounding box touches it; _grid_cells is the reverse
+        self._grid = {}
+        self._grid_cells = {}
         arcade.set_background_color(self.background)
         if first_function:
             first_function(self)
 
     def add(self, shape):
         self.shapes.append(shape)
+        self._orders[shape] = self._next_order
+        self._next_order += 1
+        self._layer(shape.depth).add(shape, self._orders[shape])
+        self._index(shape)
 
     def remove(self, shape):
-        if shape in self.shapes:
+        if shape in self._orders:
             self.shapes.remove(shape)
+            self._leave_layer(shape, shape.depth)
+            self._unindex(shape)
+            del self._orders[shape]
         # Also remove any event handlers associated with this shape
-        if self.handlers:
-            self.handlers = [(s, h) for (s, h) in self.handlers if s is not shape]
+        self.handlers.pop(shape, None)
+
+    def preload_textures(self, paths):
+        """Load images up front into the texture atlas every sprite batch
+        shares, so the first frames do not read or upload them one by one.
+        """
+        atlas = self.ctx.default_atlas
+        for path in paths:
+            atlas.add(load_texture(path))
+
+    def call_later(self, function, delay=0):
+        """Call function() once from the event loop after delay seconds, so
+        long work (computer players) runs between frames."""
+        arcade.schedule_once(lambda delta_time: function(), delay)
+
+    def _layer(self, depth):
+        if depth not in self._layers:
+            self._layers[depth] = _Layer()
+            bisect.insort(self._depths, -depth)
+        return self._layers[depth]
+
+    def _leave_layer(self, shape, depth):
+        layer = self._layers[depth]
+        layer.remove(shape)
+        if not layer.shapes:
+            del self._layers[depth]
+            self._depths.remove(-depth)
+
+    def _index(self, shape):
+        # Only the part of the bounding box inside the window can be clicked
+        left, top, right, bottom = shape.bounds()
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, self.width), min(bottom, self.height)
+        cells = [(col, row)
+                 for col in range(int(left // _GRID), int(right // _GRID) + 1)
+                 for row in range(int(top // _GRID), int(bottom // _GRID) + 1)] \
+            if left <= right and top <= bottom else []
+        for cell in cells:
+            self._grid.setdefault(cell, []).append(shape)
+        self._grid_cells[shape] = cells
+
+    def _unindex(self, shape):
+        for cell in self._grid_cells.pop(shape):
+            bucket = self._grid[cell]
+            bucket.remove(shape)
+            if not bucket:
+                del self._grid[cell]
+
+    def shape_moved(self, shape):
+        """Called by a shape after it moved, to keep hit-testing current."""
+        if shape in self._orders:
+            self._unindex(shape)
+            self._index(shape)
+
+    def shape_changed(self, shape):
+        """Called by a shape whose look changed, so its batch is rebuilt."""
+        if shape in self._orders:
+            self._layers[shape.depth].invalidate()
+            self.shape_moved(shape)
+
+    def shape_redepthed(self, shape, old_depth):
+        """Called by a shape after set_depth moved it from old_depth."""
+        if shape in self._orders:
+            self._leave_layer(shape, old_depth)
+            self._layer(shape.depth).add(shape, self._orders[shape])
 
     def on_draw(self):
         arcade.start_render()
-        # draw shapes in a stable order by depth (higher depth drawn first)
-        for shape in sorted(self.shapes, key=lambda s: getattr(s, 'depth', 0), reverse=True):
-            shape.draw()
+        # draw layers by depth (higher depth drawn first); each layer keeps
+        # its batches until one of its shapes changes
+        layers = self._layers
+        for depth in self._depths:
+            layers[-depth].draw()
+
+    def _top_shape(self, x, y):
+        """Return the top-most shape under (x, y), or None. Lower depth is
+        on top; at the same depth shapes WITH handlers win, then the later
+        added one.
+        """
+        top_shape = None
+        top_order = None
+        for shape in self._grid.get((int(x // _GRID), int(y // _GRID)), ()):
+            if shape.contains_point(x, y):
+                order = (shape.depth, 0 if shape in self.handlers else 1, -self._orders[shape])
+                if top_order is None or order < top_order:
+                    top_shape, top_order = shape, order
+        return top_shape
 
     def on_mouse_press(self, x, y, button, modifiers):
         """Handle mouse press: deliver to the single top-most shape under the
@@ -104,41 +311,10 @@ class Window(arcade.Window):
         evt = _MouseEvent(btn_name)
         evt._set_mouse_location(cs_x, cs_y)
 
-        # Find all shapes under the cursor
-        under_cursor = []
-        for idx, shape in enumerate(self.shapes):
-            try:
-                if shape.contains_point(cs_x, cs_y):
-                    # whether this shape has any registered handler
-                    has_handler = any(s is shape for (s, _) in self.handlers)
-                    under_cursor.append((shape, idx, has_handler))
-            except Exception:
-                # shapes without hit-test just ignore
-                pass
-
-        if not under_cursor:
-            return
-
-        # Determine the top-most shape: lowest depth draws last; for ties,
-        # later insertion is on top (larger index in self.shapes)
-        def _shape_order(item):
-            shape, idx, has_handler = item
-            # Lower depth is on top; prefer shapes WITH handlers at same depth;
-            # for ties, later insertion (higher idx) is on top.
-            return (getattr(shape, 'depth', 0), 0 if has_handler else 1, -idx)
-
-        top_shape, _, _ = min(under_cursor, key=_shape_order)
-
-        # Collect handlers for this shape if any
-        target_handlers = [h for (s, h) in self.handlers if s is top_shape]
-        if not target_handlers:
-            # No handler on top-most shape: block underlying shapes
-            return
-        # Call handlers (typically one)
-        for handler in target_handlers:
+        # Call the top-most shape's handlers (typically one)
+        for handler in self.handlers.get(self._top_shape(cs_x, cs_y), ()):
             if hasattr(handler, 'handle_mouse_press'):
                 handler.handle_mouse_press(evt)
-        
 
     def on_mouse_release(self, x, y, button, modifiers):
         # Dispatch mouse release to the top-most shape only
@@ -148,33 +324,69 @@ class Window(arcade.Window):
         evt = _MouseEvent(btn_name)
         evt._set_mouse_location(cs_x, cs_y)
 
-        under_cursor = []
-        for idx, shape in enumerate(self.shapes):
-            try:
-                if shape.contains_point(cs_x, cs_y):
-                    has_handler = any(s is shape for (s, _) in self.handlers)
-                    under_cursor.append((shape, idx, has_handler))
-            except Exception:
-                pass
+        for handler in self.handlers.get(self._top_shape(cs_x, cs_y), ()):
+            if hasattr(handler, 'handle_mouse_release'):
+                handler.handle_mouse_release(evt)
 
-        if not under_cursor:
-            return
+    def add_key_handler(self, handler):
+        """Send every key press to handler.handle_key_press(event)."""
+        self.key_handlers.append(handler)
 
-        def _shape_order(item):
-            shape, idx, has_handler = item
-            return (getattr(shape, 'depth', 0), 0 if has_handler else 1, -idx)
+    def on_key_press(self, symbol, modifiers):
+        evt = _KeyEvent(symbol, modifiers)
+        for handler in self.key_handlers:
+            handler.handle_key_press(evt)
 
-        top_shape, _, _ = min(under_cursor, key=_shape_order)
-        target_handlers = [h for (s, h) in self.handlers if s is top_shape]
-        if not target_handlers:
-            return
-        for handler in target_handlers:
-            if hasattr(handler, 'handle_mouse_release'):
-                handler.handle_mouse_release(evt)
+class _Shape:
+    """Parts shared by every drawable: depth, event handlers and telling the
+    window when the shape must be redrawn.
+    """
+    # How the window batches this kind of shape: 'elements', 'sprites' or
+    # 'immediate' (drawn by its own draw call)
+    batch_kind = 'immediate'
 
-class Rectangle:
-    def __init__(self, window, width=80, height=120, center=(200, 200), color=arcade.color.WHITE):
+    def __init__(self, window):
         self.window = window
+        self.depth = 0
+        # handlers registered on this shape
+        self._handlers = []
+
+    def changed(self):
+        self.window.shape_changed(self)
+
+    def set_depth(self, depth):
+        if depth != self.depth:
+            old_depth = self.depth
+            self.depth = depth
+            self.window.shape_redepthed(self, old_depth)
+
+    def add_handler(self, handler):
+        # Register handler on this shape and on the window so mouse events
+        # will be dispatched to it when the shape is clicked.
+        self._handlers.append(handler)
+        handlers = self.window.handlers.setdefault(self, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def add_to_batch(self, batch):
+        batch.append(self)
+
+    def bounds(self):
+        """Return (left, top, right, bottom) in window coordinates."""
+        return (self.center_x, self.center_y, self.center_x, self.center_y)
+
+    def contains_point(self, x, y):
+        return False
+
+    def on_screen(self):
+        left, top, right, bottom = self.bounds()
+        return right >= 0 and bottom >= 0 and left <= self.window.width and top <= self.window.height
+
+class Rectangle(_Shape):
+    batch_kind = 'elements'
+
+    def __init__(self, window, width=80, height=120, center=(200, 200), color=arcade.color.WHITE):
+        super().__init__(window)
         self.width = width
         self.height = height
         self.center_x, self.center_y = center
@@ -182,9 +394,6 @@ class Rectangle:
         self.fill_color = color
         self.border_color = arcade.color.BLACK
         self.border_width = 2
-        self.depth = 0
-        # handlers registered on this shape
-        self._handlers = []
 
     def draw(self):
         # Convert top-left origin center to arcade coordinates (bottom-left origin)
@@ -196,31 +405,39 @@ class Rectangle:
         if self.border_width and self.border_color:
             arcade.draw_rectangle_outline(self.center_x, arcade_y, self.width, self.height, self.border_color, self.border_width)
 
+    def add_to_batch(self, batch):
+        # Same geometry as draw, kept in a ShapeElementList
+        arcade_y = self.window.height - self.center_y
+        if self.fill_color:
+            batch.append(arcade.create_rectangle_filled(self.center_x, arcade_y, self.width, self.height, self.fill_color))
+        if self.border_width and self.border_color:
+            batch.append(arcade.create_rectangle_outline(self.center_x, arcade_y, self.width, self.height, self.border_color, self.border_width))
+
     def move(self, dx, dy):
         self.center_x += dx
         self.center_y += dy
+        self.changed()
 
     def move_to(self, center):
         self.center_x, self.center_y = center
+        self.changed()
 
     def set_fill_color(self, color):
         self.fill_color = _resolve_color(color)
+        self.changed()
 
     def set_border_color(self, color):
         self.border_color = _resolve_color(color)
+        self.changed()
 
     def set_border_width(self, w):
         self.border_width = w
+        self.changed()
 
-    def set_depth(self, depth):
-        self.depth = depth
-
-    def add_handler(self, handler):
-        # Register handler on this shape and on the window so mouse events
-        # will be dispatched to it when the shape is clicked.
-        self._handlers.append(handler)
-        if (self, handler) not in self.window.handlers:
-            self.window.handlers.append((self, handler))
+    def bounds(self):
+        half_w = self.width / 2 + self.border_width
+        half_h = self.height / 2 + self.border_width
+        return (self.center_x - half_w, self.center_y - half_h, self.center_x + half_w, self.center_y + half_h)
 
     def contains_point(self, x, y):
         half_w = self.width / 2
@@ -231,17 +448,17 @@ class Square(Rectangle):
     def __init__(self, window, side_length=80, center=(200, 200), color=arcade.color.WHITE):
         super().__init__(window, side_length, side_length, center, color)
 
-class Circle:
+class Circle(_Shape):
+    batch_kind = 'elements'
+
     def __init__(self, window, radius=40, center=(200, 200), color=arcade.color.WHITE):
-        self.window = window
+        super().__init__(window)
         self.radius = radius
         self.center_x, self.center_y = center
         self.color = color
         self.fill_color = color
         self.border_color = arcade.color.BLACK
         self.border_width = 2
-        self.depth = 0
-        self._handlers = []
 
     def draw(self):
         arcade_y = self.window.height - self.center_y
@@ -250,112 +467,166 @@ class Circle:
         if self.border_width and self.border_color:
             arcade.draw_circle_outline(self.center_x, arcade_y, self.radius, self.border_color, self.border_width)
 
+    def add_to_batch(self, batch):
+        arcade_y = self.window.height - self.center_y
+        diameter = 2 * self.radius
+        if self.fill_color:
+            batch.append(arcade.create_ellipse_filled(self.center_x, arcade_y, diameter, diameter, self.fill_color))
+        if self.border_width and self.border_color:
+            batch.append(arcade.create_ellipse_outline(self.center_x, arcade_y, diameter, diameter, self.border_color, self.border_width))
+
     def move(self, dx, dy):
         self.center_x += dx
         self.center_y += dy
+        self.changed()
 
     def move_to(self, center):
         self.center_x, self.center_y = center
+        self.changed()
 
     def set_fill_color(self, color):
         self.fill_color = _resolve_color(color)
+        self.changed()
 
     def set_border_color(self, color):
         self.border_color = _resolve_color(color)
+        self.changed()
 
     def set_border_width(self, w):
         self.border_width = w
+        self.changed()
 
-    def set_depth(self, depth):
-        self.depth = depth
-
-    def add_handler(self, handler):
-        self._handlers.append(handler)
-        if (self, handler) not in self.window.handlers:
-            self.window.handlers.append((self, handler))
+    def bounds(self):
+        reach = self.radius + self.border_width
+        return (self.center_x - reach, self.center_y - reach, self.center_x + reach, self.center_y + reach)
 
     def contains_point(self, x, y):
         dx = x - self.center_x
         dy = y - self.center_y
         return dx * dx + dy * dy <= self.radius * self.radius
-class Polygon:
+class Polygon(_Shape):
+    batch_kind = 'elements'
+
     def __init__(self, window, points, color=arcade.color.WHITE):
-        self.window = window
+        super().__init__(window)
         self.points = points
         self.color = color
-        self.depth = 0
 
     def draw(self):
         conv = [(x, self.window.height - y) for (x, y) in self.points]
         arcade.draw_polygon_filled(conv, self.color)
 
-    def set_depth(self, depth):
-        self.depth = depth
-class Text:
+    def add_to_batch(self, batch):
+        conv = [(x, self.window.height - y) for (x, y) in self.points]
+        batch.append(arcade.create_polygon(conv, self.color))
+
+    def bounds(self):
+        xs = [x for (x, _) in self.points]
+        ys = [y for (_, y) in self.points]
+        return (min(xs), min(ys), max(xs), max(ys))
+class Text(_Shape):
     def __init__(self, window, text, size=12, center=(200, 200), color=arcade.color.BLACK):
-        self.window = window
+        super().__init__(window)
         self.text = text
         self.size = size
         self.center_x, self.center_y = center
         self.color = color
-        self.depth = 0
-        self._handlers = []
+        # Laid out text, made on the first draw and kept until the string,
+        # size or color changes
+        self._label = None
 
     def draw(self):
         arcade_y = self.window.height - self.center_y
-        arcade.draw_text(self.text, self.center_x, arcade_y, self.color, self.size, anchor_x="center", anchor_y="center")
+        if self._label is None:
+            self._label = arcade.Text(self.text, self.center_x, arcade_y, self.color, self.size, anchor_x="center", anchor_y="center")
+        self._label.draw()
 
     def move_to(self, center):
         self.center_x, self.center_y = center
-
-    def set_depth(self, depth):
-        self.depth = depth
-
-    def add_handler(self, handler):
-        self._handlers.append(handler)
-        if (self, handler) not in self.window.handlers:
-            self.window.handlers.append((self, handler))
+        if self._label is not None:
+            # Moving keeps the layout
+            self._label.x = self.center_x
+            self._label.y = self.window.height - self.center_y
+        self.changed()
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self._label = None
+            self.changed()
+
+    def set_size(self, size):
+        if size != self.size:
+            self.size = size
+            self._label = None
+            self.changed()
+
+    def set_color(self, color):
+        color = _resolve_color(color)
+        if color != self.color:
+            self.color = color
+            self._label = None
+            self.changed()
+
+    def bounds(self):
+        # approximate bounding box for text clickable area
+        half_w = max(40, len(self.text) * (self.size // 2)) / 2
+        half_h = max(20, self.size + 6) / 2
+        return (self.center_x - half_w, self.center_y - half_h, self.center_x + half_w, self.center_y + half_h)
 
     def contains_point(self, x, y):
-        # approximate bounding box for text clickable area
-        w = max(40, len(self.text) * (self.size // 2))
-        h = max(20, self.size + 6)
-        half_w = w / 2
-        half_h = h / 2
-        return (self.center_x - half_w) <= x <= (self.center_x + half_w) and (self.center_y - half_h) <= y <= (self.center_y + half_h)
-class Image:
+        left, top, right, bottom = self.bounds()
+        return left <= x <= right and top <= y <= bottom
+class Image(_Shape):
+    batch_kind = 'sprites'
+
     def __init__(self, window, image_loc, width=100, height=100, center=(200, 200)):
-        self.window = window
-        self.texture = arcade.load_texture(image_loc)
+        super().__init__(window)
+        self.texture = load_texture(image_loc)
         self.center_x, self.center_y = center
         self.width = width
         self.height = height
         self.angle = 0
-        self.depth = 0
-        self._handlers = []
-
-    def draw(self):
-        arcade_y = self.window.height - self.center_y
+        # The sprite drawn by the layer's SpriteList; moving or turning the
+        # image updates it in place without rebuilding the batch
+        self._sprite = arcade.Sprite(texture=self.texture)
+        self._sprite.width, self._sprite.height = self._draw_size()
+        self._place_sprite()
+        self._shown = self.on_screen()
+
+    def _draw_size(self):
         # If this is a standard tile image (100x100), draw it slightly inset
         # so that the selection frame drawn behind remains visible.
         if self.width == 100 and self.height == 100:
-            draw_w = max(1, self.width - 10)
-            draw_h = max(1, self.height - 10)
-        else:
-            draw_w = self.width
-            draw_h = self.height
+            return max(1, self.width - 10), max(1, self.height - 10)
+        return self.width, self.height
+
+    def _place_sprite(self):
+        self._sprite.position = (self.center_x, self.window.height - self.center_y)
+        self._sprite.angle = self.angle
+
+    def draw(self):
+        arcade_y = self.window.height - self.center_y
+        draw_w, draw_h = self._draw_size()
         arcade.draw_texture_rectangle(self.center_x, arcade_y, draw_w, draw_h, self.texture, angle=self.angle)
 
+    def add_to_batch(self, batch):
+        batch.append(self._sprite)
+
     def move_to(self, center):
         self.center_x, self.center_y = center
+        self._place_sprite()
+        # Only entering or leaving the window changes the batch
+        if self.on_screen() != self._shown:
+            self._shown = not self._shown
+            self.changed()
+        else:
+            self.window.shape_moved(self)
 
-    def set_depth(self, depth):
-        self.depth = depth
-
-    def add_handler(self, handler):
-        self._handlers.append(handler)
-        if (self, handler) not in self.window.handlers:
-            self.window.handlers.append((self, handler))
+    def bounds(self):
+        half_w = self.width / 2
+        half_h = self.height / 2
+        return (self.center_x - half_w, self.center_y - half_h, self.center_x + half_w, self.center_y + half_h)
 
     def contains_point(self, x, y):
         half_w = self.width / 2
@@ -365,6 +636,7 @@ class Image:
     def rotate(self, angle):
         # angle in degrees; accumulate
         self.angle = (self.angle + angle) % 360
+        self._place_sprite()
 
     def set_fill_color(self, color):
         # No-op for image but present for compatibility
@@ -0,0 +1,227 @@
+import numpy as np
+
+from engine import HAND_SIZE, SIZE, board_geometry
+from helpers import load_catalogue
+
+
+class BatchEngine:
+    """ Many games with the same number of players, stored as NumPy arrays
+        and advanced one placement per game per step. Follows the same
+        rules as engine.Engine; games are rows, seats are columns. """
+
+    def __init__(self, games, num_players, catalogue=None, seed=None,
+            size=SIZE):
+        """ Deal the starting hands of every game, on size x size boards. """
+
+        catalogue = catalogue if catalogue is not None else load_catalogue()
+        tiles = catalogue.count
+        geometry = board_geometry(size)
+        cells = geometry.cells
+        slots = geometry.slots
+        # The engine's lookup tables as arrays; slot_cell gets a trailing -1
+        # so an unplaced marker (slot -1) also reads as "no cell"
+        self._port_slot = np.array(geometry.port_slot,
+            dtype=np.int16).reshape(cells, 8)
+        self._slot_cell = np.array(geometry.slot_cell + [-1], dtype=np.int16)
+        self._border_slots = np.array(geometry.border_slots, dtype=np.int16)
+        self._perms = np.frombuffer(catalogue.perms, dtype=np.uint8) \
+            .reshape(tiles, 4, 8).astype(np.int16)
+        self._rng = np.random.default_rng(seed)
+        self._num_players = num_players
+
+        self.board = np.full((games, cells), -1, dtype=np.int16)
+        self.rotation = np.zeros((games, cells), dtype=np.int8)
+        self.links = np.full((games, slots), -1, dtype=np.int16)
+        self.markers = np.full((games, num_players), -1, dtype=np.int16)
+        self.alive = np.ones((games, num_players), dtype=bool)
+        self.hands = np.full((games, num_players, HAND_SIZE), -1, dtype=np.int16)
+        self.pile = np.ones((games, tiles), dtype=bool)
+        self.dragon = np.full(games, -1, dtype=np.int16)
+        self.current = np.zeros(games, dtype=np.int16)
+        self.turns = np.zeros(games, dtype=np.int32)
+        # Turn on which each seat was eliminated, 0 while still in
+        self.eliminated_at = np.zeros((games, num_players), dtype=np.int32)
+        self.done = np.zeros(games, dtype=bool)
+
+        rows = np.arange(games)
+        for _ in range(HAND_SIZE):
+            for seat in range(num_players):
+                self._deal(rows, np.full(games, seat, dtype=np.int16))
+
+    # -- Setup ---------------------------------------------------------------
+
+    def place_markers(self, spots=None):
+        """ Put every marker on its border spot, a (games, players) array of
+            0-47 on 6x6, or on distinct random spots; then start the first
+            turn. """
+
+        games = self.board.shape[0]
+        if spots is None:
+            keys = self._rng.random((games, self._border_slots.size))
+            spots = np.argsort(keys, axis=1)[:, :self._num_players]
+        self.markers[:] = self._border_slots[spots]
+        self._start_turn(np.arange(games))
+
+    # -- Moves ---------------------------------------------------------------
+
+    def step(self, hand_index=None, rotation=None):
+        """ Play one placement in every unfinished game. hand_index picks the
+            current seat's tile by its position in the hand and rotation its
+            turn (0-3), both arrays over all games; random when omitted. """
+
+        rows = np.nonzero(~self.done)[0]
+        if rows.size == 0:
+            return
+        count = rows.size
+        seats = self.current[rows]
+        hands = self.hands[rows, seats]
+
+        if hand_index is None:
+            keys = self._rng.random(hands.shape)
+            keys[hands == -1] = -1.0
+            hand_index = keys.argmax(axis=1)
+        else:
+            hand_index = hand_index[rows]
+        if rotation is None:
+            rotation = self._rng.integers(0, 4, count)
+        else:
+            rotation = rotation[rows]
+
+        tiles = hands[np.arange(count), hand_index]
+        self.hands[rows, seats, hand_index] = -1
+        cells = self._slot_cell[self.markers[rows, seats]]
+        self.board[rows, cells] = tiles
+        self.rotation[rows, cells] = rotation
+
+        # Fill the 8 transition entries of each new tile at once
+        slots = self._port_slot[cells]
+        targets = np.take_along_axis(slots, self._perms[tiles, rotation], axis=1)
+        self.links[rows[:, None], slots] = targets
+        self.turns[rows] += 1
+
+        self._deal(rows, seats)
+        self._move_markers(rows)
+        self._eliminate(rows)
+        self._finish_turn(rows)
+
+    def run(self):
+        """ Play every game to the end with random moves, return winners. """
+
+        while not self.done.all():
+            self.step()
+        return self.winners()
+
+    def _move_markers(self, rows):
+        """ Advance all markers of the given games in lockstep; a marker
+            stops once the slot it faces has no tile. """
+
+        markers = self.markers[rows]
+        alive = self.alive[rows]
+        links = self.links[rows]
+        index = np.arange(rows.size)[:, None]
+        while True:
+            exits = links[index, markers]
+            moving = (exits != -1) & alive
+            if not moving.any():
+                break
+            markers = np.where(moving, exits ^ 1, markers)
+        self.markers[rows] = markers
+
+    def _eliminate(self, rows):
+        """ Eliminate markers that walked off the board, returning their tiles
+            and the dragon to the pile. """
+
+        out = self.alive[rows] & (self._slot_cell[self.markers[rows]] == -1)
+        if not out.any():
+            return
+        game_index, seats = np.nonzero(out)
+        games = rows[game_index]
+        self.alive[games, seats] = False
+        self.eliminated_at[games, seats] = self.turns[games]
+
+        tiles = self.hands[games, seats]
+        held = tiles != -1
+        self.pile[np.repeat(games, HAND_SIZE)[held.ravel()], tiles[held]] = True
+        self.hands[games, seats] = -1
+
+        dragon = self.dragon[games] == seats
+        self.dragon[games[dragon]] = -1
+
+    def _finish_turn(self, rows):
+        """ Mark finished games and pass the turn in the others. """
+
+        alive = self.alive[rows]
+        hands_left = ((self.hands[rows] != -1) & alive[:, :, None]).any(axis=(1, 2))
+        pile_left = self.pile[rows].any(axis=1)
+        over = (alive.sum(axis=1) <= 1) | (~pile_left & ~hands_left)
+        self.done[rows[over]] = True
+
+        rows = rows[~over]
+        self.current[rows] = self._next_seat(rows, self.current[rows])
+        self._start_turn(rows)
+
+    def _next_seat(self, rows, seats):
+        """ Return the next seat still in each game after the given seats. """
+
+        players = self._num_players
+        candidates = (seats[:, None] + np.arange(1, players + 1)) % players
+        still_in = self.alive[rows[:, None], candidates]
+        return candidates[np.arange(rows.size), still_in.argmax(axis=1)]
+
+    # -- Tiles ---------------------------------------------------------------
+
+    def _deal(self, rows, seats):
+        """ Deal a random pile tile to each (game, seat), or the dragon when
+            that game's pile is empty. """
+
+        has_pile = self.pile[rows].any(axis=1)
+
+        games = rows[has_pile]
+        if games.size:
+            takers = seats[has_pile]
+            keys = self._rng.random((games.size, self.pile.shape[1]))
+            keys[~self.pile[games]] = -1.0
+            tiles = keys.argmax(axis=1)
+            self.pile[games, tiles] = False
+            free = (self.hands[games, takers] == -1).argmax(axis=1)
+            self.hands[games, takers, free] = tiles
+
+        games = rows[~has_pile]
+        takers = seats[~has_pile]
+        free_dragon = self.dragon[games] == -1
+        self.dragon[games[free_dragon]] = takers[free_dragon]
+
+    def _replenish(self, rows, seats):
+        """ The dragon holder draws first when the pile refills; otherwise
+            top a short hand up to 3 tiles. """
+
+        holder = (self.dragon[rows] == seats) & self.pile[rows].any(axis=1)
+        if holder.any():
+            self.dragon[rows[holder]] = -1
+            self._deal(rows[holder], seats[holder])
+
+        short = (self.hands[rows, seats] != -1).sum(axis=1) < HAND_SIZE
+        top_up = (self.dragon[rows] == -1) & self.pile[rows].any(axis=1) & short
+        if top_up.any():
+            self._deal(rows[top_up], seats[top_up])
+
+    def _start_turn(self, rows):
+        """ Refill the current seat's hand; seats left without tiles pass. """
+
+        for _ in range(self._num_players):
+            if rows.size == 0:
+                return
+            seats = self.current[rows]
+            self._replenish(rows, seats)
+            empty = (self.hands[rows, seats] == -1).all(axis=1)
+            rows = rows[empty]
+            self.current[rows] = self._next_seat(rows, self.current[rows])
+
+    # -- Queries -------------------------------------------------------------
+
+    def winners(self):
+        """ Return the winning seat of each game, -1 for ties and games that
+            are still running. """
+
+        single = self.done & (self.alive.sum(axis=1) == 1)
+        return np.where(single, self.alive.argmax(axis=1), -1)
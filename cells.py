@@ -1,4 +1,5 @@
 from arcadegraphics import *
+from constants import BOARD_SIZE, CELL_LEN
 
 
 class Cell():
@@ -10,10 +11,11 @@ class Cell():
         self._win = win
         self._game = game
         self._location = location
-        self._body = Square(self._win, 100, self._location)
+        self._body = Square(self._win, CELL_LEN, self._location)
         self._body.set_fill_color("")
         self._body.set_depth(35)
-        self._body.set_border_width(0)
+        # The board picture has a 6x6 grid, other sizes outline their cells
+        self._body.set_border_width(0 if BOARD_SIZE == 6 else 1)
         self._win.add(self._body)
 
     def give_handler(self):
@@ -31,11 +33,16 @@ class Cell():
     def create_unclickable_layer(self):
         """ Make an unclickable layer to lock this cell from doing anything. """
 
-        layer = Square(self._win, 100, self._location)
-        layer.set_fill_color("")
-        layer.set_depth(5)
-        layer.set_border_color("")
-        self._win.add(layer)
+        self._layer = Square(self._win, CELL_LEN, self._location)
+        self._layer.set_fill_color("")
+        self._layer.set_depth(5)
+        self._layer.set_border_color("")
+        self._win.add(self._layer)
+
+    def remove_unclickable_layer(self):
+        """ Unlock the cell again when its tile is taken back. """
+
+        self._win.remove(self._layer)
 
     def get_location(self):
         """ Returns the location (a tuple) of the Cell. """
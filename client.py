@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+
+from engine import Engine
+from helpers import load_tile_set
+from movelog import decode_move, encode_move
+from policies import POLICIES, make_policy
+from server import PORT, TableServer, decode_message, encode_message
+
+
+class TableClient:
+    """ One seat at a TableServer table, for bots, load tests and scripts.
+        engine plays every start spot and move of the table. The server
+        only shows this seat's hand, so engine deals the other hands and
+        the pile at random and corrects them (Engine.reveal) as tiles are
+        played; the board, markers, hand sizes and dragon are the table's. """
+
+    def __init__(self, catalogue=None):
+        """ The Constructor for TableClient class. catalogue must be the
+            server's tile set. """
+
+        self._catalogue = catalogue if catalogue is not None \
+            else load_tile_set()
+        self._reader = None
+        self._writer = None
+        self.table = None
+        self.seat = None
+        self.engine = None
+
+    async def connect(self, host='127.0.0.1', port=PORT):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def send(self, message):
+        self._writer.write(encode_message(message))
+        await self._writer.drain()
+
+    async def receive(self, accepted=None):
+        """ Wait for the next server message, play it on the engine and
+            return it. accepted, if given, plays this seat's own start spot
+            or move on the engine when the server's "hand" reply shows it
+            was taken. Raises ValueError on an error reply and
+            ConnectionError once the server hangs up. """
+
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        message = decode_message(line)
+        if message['op'] == 'hand' and accepted is not None:
+            accepted()
+        self.apply(message)
+        return message
+
+    def apply(self, message):
+        """ Bring the engine up to date with a server message. Raises
+            ValueError when the engine and the table disagree. """
+
+        op = message['op']
+        if op == 'joined':
+            if message['tiles'] != self._catalogue.digest:
+                raise ValueError("table plays another tile set")
+            self.engine = Engine(message['players'], self._catalogue,
+                random.Random(), message['size'])
+            self.table = message['table']
+            self.seat = message['seat']
+            for seat, index in enumerate(message['starts']):
+                self.engine.place_marker(seat, index)
+            for code in message['moves']:
+                self.play_move(self.engine.current_seat(), code)
+        elif op == 'start':
+            self.engine.place_marker(message['seat'], message['spot'])
+        elif op == 'move':
+            out = self.play_move(message['seat'], message['move'])
+            if out != message['out'] or \
+                    self.engine.dragon_holder() != message['dragon']:
+                raise ValueError("engine is out of step with the table")
+        elif op == 'error':
+            raise ValueError(message['reason'])
+        if 'hand' in message:
+            self.engine.reveal(self.seat, message['hand'])
+            if sorted(self.engine.hand(self.seat)) != sorted(message['hand']):
+                raise ValueError("engine is out of step with the table")
+
+    def play_move(self, seat, code):
+        """ Play a seat's move on the engine, giving the seat the tile
+            first; returns the seats it put out. """
+
+        engine = self.engine
+        move = decode_move(code, engine.geometry().cells)
+        engine.reveal(seat, move[:1])
+        return engine.apply_move(move)
+
+    async def join(self, table, players=2):
+        """ Sit at a table (made for players seats if it is new) and wait
+            for the game so far. """
+
+        await self.send({'op': 'join', 'table': table, 'players': players})
+        while self.engine is None:
+            await self.receive()
+
+    def on_move(self):
+        """ Return True while this seat is to place its marker or a tile. """
+
+        engine = self.engine
+        if engine.in_setup():
+            return engine.setup_seat() == self.seat
+        return not engine.is_terminal() and engine.current_seat() == self.seat
+
+    async def place_marker(self, index):
+        """ Place this seat's marker on a border spot. The engine only
+            changes once the server accepts it; a refusal raises
+            ValueError. """
+
+        await self.send({'op': 'start', 'spot': index})
+        await self.receive_hand(
+            lambda: self.engine.place_marker(self.seat, index))
+
+    async def apply_move(self, move):
+        """ Play a (tile, rotation, cell) move for this seat. The engine
+            only changes once the server accepts it; a refusal raises
+            ValueError. """
+
+        if self.engine.current_seat() != self.seat:
+            raise ValueError("not this seat's turn")
+        await self.send({'op': 'move',
+            'move': encode_move(move, self.engine.geometry().cells)})
+        await self.receive_hand(lambda: self.engine.apply_move(move))
+
+    async def receive_hand(self, accepted):
+        """ Wait for the server's reply to this seat's own start spot or
+            move, the hand it holds after it, playing the action with
+            accepted first. """
+
+        while (await self.receive(accepted))['op'] != 'hand':
+            pass
+
+
+async def play_seat(table, players, policy, catalogue=None,
+        host='127.0.0.1', port=PORT):
+    """ Join a table and let a policy play the seat to the end of the game;
+        returns the client. """
+
+    client = TableClient(catalogue)
+    await client.connect(host, port)
+    await client.join(table, players)
+    engine = client.engine
+    while not engine.is_terminal():
+        if not client.on_move():
+            await client.receive()
+        elif engine.in_setup():
+            await client.place_marker(policy.choose_start(engine, client.seat))
+        else:
+            await client.apply_move(policy.choose_move(engine))
+    await client.close()
+    return client
+
+
+class ClientThread:
+    """ A server connection for programs that run their own event loop
+        (the arcade window): an asyncio loop in a daemon thread writes the
+        messages given to send and queues the ones received, which the
+        program takes with received. A failed or lost connection is queued
+        as an error message. """
+
+    def __init__(self, host='127.0.0.1', port=PORT):
+        """ The Constructor for ClientThread class. """
+
+        self._inbox = queue.Queue()
+        # Messages sent before the connection is made wait here
+        self._outbox = []
+        self._writer = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_until_complete,
+            args=(self._pump(host, port),), daemon=True).start()
+
+    async def _pump(self, host, port):
+        try:
+            reader, self._writer = await asyncio.open_connection(host, port)
+            for message in self._outbox:
+                self._write(message)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._inbox.put(decode_message(line))
+        except (OSError, ValueError) as error:
+            self._inbox.put({'op': 'error', 'reason': str(error)})
+            return
+        self._inbox.put(
+            {'op': 'error', 'reason': "server closed the connection"})
+
+    def _write(self, message):
+        if self._writer is None:
+            self._outbox.append(message)
+        else:
+            self._writer.write(encode_message(message))
+
+    def send(self, message):
+        """ Send a message from any thread. """
+
+        self._loop.call_soon_threadsafe(self._write, message)
+
+    def received(self):
+        """ Return the messages received since the last call. """
+
+        messages = []
+        while not self._inbox.empty():
+            messages.append(self._inbox.get_nowait())
+        return messages
+
+
+async def load_test(tables, players, policy_name, seed, host, port, serve):
+    """ Play tables games at once, every seat its own connection, against a
+        server at host:port or one started in this process (serve). """
+
+    catalogue = load_tile_set()
+    server = None
+    if serve:
+        server = await TableServer(catalogue, seed=seed).start(host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    rng = random.Random(seed)
+    began = time.perf_counter()
+    clients = await asyncio.gather(*[
+        play_seat('load-' + str(table), players,
+            make_policy(policy_name, random.Random(rng.getrandbits(64))),
+            catalogue, host, port)
+        for table in range(tables) for _ in range(players)])
+    seconds = time.perf_counter() - began
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+    moves = sum(len(client.engine.moves()) for client in clients
+        if client.seat == 0)
+    return {'tables': tables, 'players': players, 'moves': moves,
+        'seconds': round(seconds, 3),
+        'moves_per_second': round(moves / seconds)}
+
+
+def main(argv=None):
+    """ Command line entry point: play many bot tables over the network and
+        print the throughput as JSON. """
+
+    parser = argparse.ArgumentParser(
+        description="Play Tsuro bot tables against a table server.")
+    parser.add_argument('-t', '--tables', type=int, default=100)
+    parser.add_argument('-p', '--players', type=int, default=4)
+    parser.add_argument('--policy', default='random', choices=sorted(POLICIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--serve', action='store_true',
+        help="start a server in this process on a free port")
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.players <= 8:
+        parser.error("players must be between 2 and 8")
+
+    print(json.dumps(asyncio.run(load_test(args.tables, args.players,
+        args.policy, args.seed, args.host, args.port, args.serve)),
+        separators=(',', ':')))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,47 @@
 WIN_WIDTH = 1500
 WIN_HEIGHT = 800
 BOARD_LEN = 600
+# Cells along each side of the board: 6 is standard Tsuro, up to 12
+BOARD_SIZE = 6
+# Tiles: a matches file like matches.txt, 'generated' for the 35 distinct
+# tiles computed from the port pairings, or 'generated-all' for all 105
+# pairings. Only matches.txt has pictures; other sets are drawn.
+TILE_SET = 'matches.txt'
 
-IMG_DIR = 'images'
\ No newline at end of file
+# Side of a board cell in pixels
+CELL_LEN = BOARD_LEN // BOARD_SIZE
+# Pixel centers of the board cells along each side
+CELL_COORDS = [400 - BOARD_LEN // 2 + CELL_LEN // 2 + CELL_LEN * n
+    for n in range(BOARD_SIZE)]
+# Ports 1-8 around the center of a cell, in sixths of a cell, and in pixels
+PORT_SIXTHS = [(-1, -3), (1, -3), (-3, -1), (3, -1), (-3, 1), (3, 1), \
+    (-1, 3), (1, 3)]
+PORT_SHIFTS = [(x * CELL_LEN // 6, y * CELL_LEN // 6) for x, y in PORT_SIXTHS]
+
+IMG_DIR = 'images'
+
+# Seats played by the computer: player number -> policy name ('mcts', 'safe'
+# or 'random'), e.g. {'2': 'mcts'}
+COMPUTER_PLAYERS = {}
+# Thinking time per move for search based computer players, in seconds
+COMPUTER_TIME_LIMIT = 1.0
+# Pause before a computer player acts, so its turn can be seen
+COMPUTER_DELAY = 0.5
+
+# Seed of the tile deals, None picks a new one every game
+GAME_SEED = None
+# Folder to write a move log of every game to (movelog.py), None for none
+MOVE_LOG_DIR = None
+# Move log of the game in progress, resumed on the next start if the game
+# did not finish (crash recovery); None turns it off
+AUTOSAVE_PATH = 'autosave.tsl'
+
+# Table server (server.py) to play on, e.g. ('127.0.0.1', 8765); None plays
+# every seat in this window. Seats not taken by this window are played by
+# the other clients at the table, the computer players only take this
+# window's seat
+SERVER_ADDRESS = None
+# Name of the table to join; the first client chooses its player count
+SERVER_TABLE = 'tsuro'
+# Seconds between checks for the table's messages
+SERVER_POLL = 0.05
@@ -0,0 +1,901 @@
+import random
+from helpers import load_catalogue
+from zobrist import zobrist_tables
+
+# Board geometry: SIZE x SIZE cells (6 by default, up to MAX_SIZE), each cell
+# has 8 ports numbered 1-8 like matches.txt
+#   1 2        1/2 top edge, 3/5 left edge, 4/6 right edge, 7/8 bottom edge
+#  3   4
+#  5   6
+#   7 8
+SIZE = 6
+MAX_SIZE = 12
+HAND_SIZE = 3
+
+# Ports sit on cell edges, so two neighbouring cells share them. Every shared
+# spot on the board is one "point":
+#   horizontal edges (top/bottom of cells): (edge_row * size + col) * 2 + k
+#   vertical edges (left/right of cells):   h_points + (edge_col * size + row) * 2 + k
+# where k is 0 for the left/upper port and 1 for the right/lower port.
+#
+# A point touches at most 2 cells, one on each side of its edge (side 0 is
+# the cell above/left of the edge, side 1 the cell below/right). A "slot" is
+# one side of a point, 2 * point + side, so each (cell, port) pair has its own
+# slot and the transition table is a flat list indexed by slot.
+
+
+class Geometry:
+    """ The lookup tables of one board size. Cells are numbered column
+        major (col * size + row), like Game. """
+
+    def __init__(self, size):
+        """ The Constructor for Geometry class. """
+
+        if not 1 <= size <= MAX_SIZE:
+            raise ValueError("board size must be 1 to " + str(MAX_SIZE))
+        self.size = size
+        self.cells = size * size
+        self.h_points = (size + 1) * size * 2
+        self.points = self.h_points * 2
+        self.slots = self.points * 2
+
+        # port_slot[cell * 8 + port - 1] -> slot
+        self.port_slot = self._build_port_slots()
+        # The 8 * size border points, clockwise from the top-left corner
+        self.border = self._build_border()
+
+        # slot_cell[slot] -> cell on that side of the point, -1 off the
+        # board, and slot_port[slot] -> which of that cell's ports (0-7) the
+        # slot is
+        self.slot_cell = [-1] * self.slots
+        self.slot_port = [-1] * self.slots
+        # point_cells[point] -> (cell, port) pairs touching that point (1 or
+        # 2 of them), used by the view to turn points into pixels
+        self.point_cells = [[] for _ in range(self.points)]
+        for n, slot in enumerate(self.port_slot):
+            self.slot_cell[slot] = n // 8
+            self.slot_port[slot] = n % 8
+            self.point_cells[slot >> 1].append((n // 8, n % 8 + 1))
+
+        # Markers are kept as the slot they face, i.e. the side of their
+        # point they will move through next. A marker on the border starts
+        # facing the board.
+        self.border_slots = [point * 2 if self.slot_cell[point * 2] != -1
+            else point * 2 + 1 for point in self.border]
+
+    def cell_index(self, col, row):
+        return col * self.size + row
+
+    def _h_point(self, edge_row, col, k):
+        return (edge_row * self.size + col) * 2 + k
+
+    def _v_point(self, edge_col, row, k):
+        return self.h_points + (edge_col * self.size + row) * 2 + k
+
+    def _build_port_slots(self):
+        """ For every cell, the slot that each of its 8 ports sits on. """
+
+        h_point, v_point = self._h_point, self._v_point
+        table = []
+        for col in range(self.size):
+            for row in range(self.size):
+                # Ports 1/2/3/5 face the cell's top/left edges (side 1 of
+                # those points), ports 4/6/7/8 its right/bottom edges (side 0)
+                table += [
+                    h_point(row, col, 0) * 2 + 1, h_point(row, col, 1) * 2 + 1,
+                    v_point(col, row, 0) * 2 + 1, v_point(col + 1, row, 0) * 2,
+                    v_point(col, row, 1) * 2 + 1, v_point(col + 1, row, 1) * 2,
+                    h_point(row + 1, col, 0) * 2, h_point(row + 1, col, 1) * 2]
+        return table
+
+    def _build_border(self):
+        last = self.size
+        sides = range(self.size)
+        border = []
+        for col in sides:
+            border += [self._h_point(0, col, 0), self._h_point(0, col, 1)]
+        for row in sides:
+            border += [self._v_point(last, row, 0), self._v_point(last, row, 1)]
+        for col in reversed(sides):
+            border += [self._h_point(last, col, 1), self._h_point(last, col, 0)]
+        for row in reversed(sides):
+            border += [self._v_point(0, row, 1), self._v_point(0, row, 0)]
+        return border
+
+
+# Geometries already built, by board size
+_geometries = {}
+
+
+def board_geometry(size=SIZE):
+    """ Return the shared Geometry of a board size. """
+
+    if size not in _geometries:
+        _geometries[size] = Geometry(size)
+    return _geometries[size]
+
+
+# The tables of the standard 6x6 board
+_STANDARD = board_geometry(SIZE)
+CELLS = _STANDARD.cells
+H_POINTS = _STANDARD.h_points
+POINTS = _STANDARD.points
+SLOTS = _STANDARD.slots
+PORT_SLOT = _STANDARD.port_slot
+BORDER = _STANDARD.border
+SLOT_CELL = _STANDARD.slot_cell
+SLOT_PORT = _STANDARD.slot_port
+POINT_CELLS = _STANDARD.point_cells
+BORDER_SLOTS = _STANDARD.border_slots
+
+
+def cell_index(col, row):
+    """ Return the cell number used by the engine (column major, like Game). """
+
+    return col * SIZE + row
+
+
+class Delta:
+    """ What one marker placement or move changed, enough to take it back.
+
+        action is (seat, index) for a placement or the (tile, rotation, cell)
+        move, and seat who made it. markers, starts and hands hold (seat, old
+        value) for only the entries that changed and eliminated the seats it
+        put out. pile_ops lists the pile changes in order: (size, index,
+        tile) for a tile drawn from a pile of size tiles, or the number of
+        tiles put back on its end. The tile and its transition entries are
+        cleared through the move's cell, and the random number generator is
+        rewound by replaying the draws left in the history. """
+
+    def __init__(self, engine, seat, action):
+        """ The Constructor for Delta class, taken before the change. """
+
+        self.seat = seat
+        self.action = action
+        self.markers = engine._markers[:]
+        self.starts = engine._starts[:]
+        self.hands = [hand[:] for hand in engine._hands]
+        self.eliminated = engine._alive[:]
+        self.pile_ops = []
+        self.dragon = engine._dragon
+        self.dragon_events = len(engine._dragon_events)
+        self.current = engine._current
+        self.placed = engine._placed
+        self.turns = engine._turns
+        self.key = engine._key
+
+    def trim(self, engine):
+        """ Keep only what the change overwrote, once it is done. """
+
+        self.markers = [(seat, slot) for seat, slot in enumerate(self.markers)
+            if slot != engine._markers[seat]]
+        self.starts = [(seat, index) for seat, index in enumerate(self.starts)
+            if index != engine._starts[seat]]
+        self.hands = [(seat, hand) for seat, hand in enumerate(self.hands)
+            if hand != engine._hands[seat]]
+        self.eliminated = [seat for seat, alive in enumerate(self.eliminated)
+            if alive != engine._alive[seat]]
+
+
+class Engine:
+    """ Headless Tsuro rules: board, markers, hands and pile as integers.
+
+        Seats are numbered from 0, tiles are the line numbers of matches.txt
+        and a move is a (tile, rotation, cell) tuple. """
+
+    def __init__(self, num_players, catalogue=None, rng=None, size=SIZE):
+        """ Deal the starting hands; markers still have to be placed. The
+            board has size x size cells. """
+
+        self._catalogue = catalogue if catalogue is not None \
+            else load_catalogue()
+        self._rng = rng if rng is not None else random.Random()
+        self._num_players = num_players
+        geometry = self._geometry = board_geometry(size)
+
+        # Board: tile id and rotation for each cell, -1 means empty
+        self._board = [-1] * geometry.cells
+        self._rotation = [0] * geometry.cells
+
+        # Transition table: entering a placed tile through a slot leads to
+        # the slot it exits through, -1 while that cell is empty
+        self._links = [-1] * geometry.slots
+
+        # Markers: the slot each seat faces, -1 before it is placed, and the
+        # reverse index from a slot to the seat facing it
+        self._markers = [-1] * num_players
+        self._facing = [-1] * geometry.slots
+        self._alive = [True] * num_players
+        self._alive_count = num_players
+        # Border spot each seat started on (0-47 on 6x6), -1 before placing
+        self._starts = [-1] * num_players
+
+        # Tiles: the pile, per seat hands, and the dragon holder (-1 is pile).
+        # The pile is unordered: a draw swaps the last tile into the drawn
+        # tile's place, and returned tiles go on the end
+        self._pile = list(range(self._catalogue.count))
+        self._hands = [[] for _ in range(num_players)]
+        self._dragon = -1
+        # (turn, seat, taken) every time the dragon changes hands
+        self._dragon_events = []
+
+        self._current = 0
+        self._placed = 0
+        self._turns = 0
+        self._moves = []
+
+        # Zobrist key of the position, kept up to date by every change
+        self._zobrist = zobrist_tables(geometry.cells, geometry.slots,
+            self._catalogue.count)
+        self._key = self._zobrist.turn[0]
+
+        # True while the state lists, or the random number generator, may be
+        # shared with a copy or snapshot; the first change then copies them
+        # (copy on write)
+        self._shared = False
+        self._rng_shared = False
+
+        # Undo: a Delta per placement and move while history is kept (None
+        # when it is not), and the actions undone since, newest last
+        self._history = None
+        self._undone = []
+        # While history is kept: the random number generator's state when it
+        # started, and the pile_ops of the Delta being recorded
+        self._rng_origin = None
+        self._pile_ops = None
+
+        for _ in range(HAND_SIZE):
+            for seat in range(num_players):
+                self._deal_card(seat)
+
+    # -- Setup ---------------------------------------------------------------
+
+    def start_spot_free(self, index):
+        """ Return True if no marker occupies the given border spot (0-47 on
+            6x6). """
+
+        return self._geometry.border_slots[index] not in self._markers
+
+    def place_marker(self, seat, index):
+        """ Put the seat's marker on a free border spot; seats place them in
+            order and the game starts once every marker is placed. Raises
+            ValueError when it is not the seat's turn to place or the spot is
+            not free. """
+
+        if not self.in_setup() or seat != self.setup_seat():
+            raise ValueError("seat " + str(seat) + " may not place a marker")
+        if not (0 <= index < len(self._geometry.border_slots)
+                and self.start_spot_free(index)):
+            raise ValueError("start spot not free: " + repr(index))
+
+        self.unshare()
+        delta = self._begin_delta(seat, (seat, index))
+        markers = self._zobrist.marker
+        slots = self._geometry.slots
+        slot = self._geometry.border_slots[index]
+        self._placed += 1
+        self._markers[seat] = slot
+        self._starts[seat] = index
+        self._facing[slot] = seat
+        self._key ^= markers[seat * slots + slot]
+        if self._placed == self._num_players:
+            self._start_turn()
+        self._end_delta(delta)
+
+    def in_setup(self):
+        """ Return True while some markers are not placed yet. """
+
+        return self._placed < self._num_players
+
+    def setup_seat(self):
+        """ Return the seat to place its marker next (seats place them in
+            order), or -1 once every marker is placed. """
+
+        return self._starts.index(-1) if -1 in self._starts else -1
+
+    # -- Moves ---------------------------------------------------------------
+
+    def placement_cells(self, seat):
+        """ Return the empty cells next to the seat's marker. """
+
+        slot = self._markers[seat]
+        if slot == -1:
+            return []
+        cell = self._geometry.slot_cell[slot]
+        if cell != -1 and self._board[cell] == -1:
+            return [cell]
+        return []
+
+    def legal_moves(self, seat=None):
+        """ Return every (tile, rotation, cell) a seat (default: the current
+            one) can play from its hand. Rotations of a symmetric tile that
+            connect the same ports are only listed once. """
+
+        if seat is None:
+            seat = self._current
+        if self.in_setup() or self.is_terminal() or not self._alive[seat]:
+            return []
+        cells = self.placement_cells(seat)
+        rotations = self._catalogue.rotations
+        return [(tile, rotation, cell) for tile in self._hands[seat]
+            for rotation in rotations[tile] for cell in cells]
+
+    def flagged_moves(self, seat=None):
+        """ Return legal_moves as (tile, rotation, cell, suicidal) tuples,
+            where suicidal means the seat's own marker would leave the board. """
+
+        if seat is None:
+            seat = self._current
+        return [move + (self.suicidal(move, seat),)
+            for move in self.legal_moves(seat)]
+
+    def safe_moves(self, seat=None):
+        """ Return the legal moves that keep the seat's marker on the board. """
+
+        if seat is None:
+            seat = self._current
+        return [move for move in self.legal_moves(seat)
+            if not self.suicidal(move, seat)]
+
+    def suicidal(self, move, seat=None):
+        """ Return True if playing the move would take the seat's marker off
+            the board. The board is not changed. """
+
+        if seat is None:
+            seat = self._current
+        tile, rotation, cell = move
+        return self._geometry.slot_cell[self.trace(self._markers[seat], tile,
+            rotation, cell)] == -1
+
+    def trace(self, slot, tile=-1, rotation=0, cell=-1):
+        """ Return the slot a marker facing the given slot would stop at,
+            optionally as if tile were placed on the empty cell. """
+
+        links = self._links
+        perms = self._catalogue.perms
+        geometry = self._geometry
+        slot_cell = geometry.slot_cell
+        start = (tile * 4 + rotation) * 8
+        base = cell * 8
+        while True:
+            exit_slot = links[slot]
+            if exit_slot == -1:
+                # The path may run through the new tile more than once
+                if slot_cell[slot] != cell or cell == -1:
+                    return slot
+                exit_slot = geometry.port_slot[
+                    base + perms[start + geometry.slot_port[slot]]]
+            slot = exit_slot ^ 1
+
+    def is_legal(self, move):
+        """ Return True if the current seat may play this move. """
+
+        tile, rotation, cell = move
+        seat = self._current
+        return not self.in_setup() and not self.is_terminal() and \
+            tile in self._hands[seat] and \
+            0 <= rotation < 4 and cell in self.placement_cells(seat)
+
+    def apply_move(self, move):
+        """ Place a tile for the current seat, draw, move all markers,
+            eliminate players and pass the turn. Returns the seats
+            eliminated by this move. """
+
+        if self.in_setup():
+            raise ValueError("markers are still being placed")
+        if not self.is_legal(move):
+            raise ValueError("illegal move: " + repr(move))
+
+        self.unshare()
+        tile, rotation, cell = move
+        seat = self._current
+        delta = self._begin_delta(seat, tuple(move))
+        self._moves.append(move)
+        self._hands[seat].remove(tile)
+        self._board[cell] = tile
+        self._rotation[cell] = rotation
+        tiles = self._catalogue.count
+        self._key ^= self._zobrist.hand[seat * tiles + tile] ^ \
+            self._zobrist.cell[(cell * tiles + tile) * 4 + rotation]
+        self._update_links(tile, rotation, cell)
+        self._turns += 1
+
+        # Draw after placing, then move the markers facing the new tile;
+        # nobody else's path changed
+        self._deal_card(seat)
+        eliminated = []
+        for other in self.markers_facing(cell):
+            self._move_marker(other)
+            if self._check_elimination(other):
+                eliminated.append(other)
+
+        if not self.is_terminal():
+            self._set_current(self.next_seat(seat))
+            self._start_turn()
+        self._end_delta(delta)
+        return eliminated
+
+    def _update_links(self, tile, rotation, cell):
+        """ Fill the cell's 8 transition entries from the tile's compiled
+            port permutation. """
+
+        links = self._links
+        perms = self._catalogue.perms
+        port_slot = self._geometry.port_slot
+        base = cell * 8
+        start = (tile * 4 + rotation) * 8
+        for port in range(8):
+            links[port_slot[base + port]] = port_slot[base + perms[start + port]]
+
+    def markers_facing(self, cell):
+        """ Return, in seat order, the seats whose markers face a cell. """
+
+        facing = self._facing
+        base = cell * 8
+        seats = [facing[slot]
+            for slot in self._geometry.port_slot[base:base + 8]
+            if facing[slot] != -1]
+        seats.sort()
+        return seats
+
+    def _move_marker(self, seat):
+        """ Follow the seat's path until it ends, one lookup per tile. """
+
+        # Every tile is left through the other side of the exit point, so
+        # the facing slot alone says where to go and no history is needed
+        links = self._links
+        slot = self._markers[seat]
+        exit_slot = links[slot]
+        while exit_slot != -1:
+            slot = exit_slot ^ 1
+            exit_slot = links[slot]
+        self._facing[self._markers[seat]] = -1
+        self._facing[slot] = seat
+        markers = self._zobrist.marker
+        slots = self._geometry.slots
+        self._key ^= markers[seat * slots + self._markers[seat]] ^ \
+            markers[seat * slots + slot]
+        self._markers[seat] = slot
+
+    def _check_elimination(self, seat):
+        """ Eliminate a seat whose marker left the board and put its tiles
+            back in the pile. Returns True if it was eliminated. """
+
+        # Only a marker that walked off a border edge faces no cell
+        if self._geometry.slot_cell[self._markers[seat]] != -1:
+            return False
+
+        self._alive[seat] = False
+        self._alive_count -= 1
+        hand_keys = self._zobrist.hand
+        for tile in self._hands[seat]:
+            self._key ^= hand_keys[seat * self._catalogue.count + tile]
+        if self._pile_ops is not None and self._hands[seat]:
+            self._pile_ops.append(len(self._hands[seat]))
+        self._pile.extend(self._hands[seat])
+        self._hands[seat] = []
+        if self._dragon == seat:
+            self._return_dragon()
+        return True
+
+    def next_seat(self, seat):
+        """ Return the next seat still in the game after the given one. """
+
+        for step in range(1, self._num_players + 1):
+            other = (seat + step) % self._num_players
+            if self._alive[other]:
+                return other
+        return seat
+
+    def _set_current(self, seat):
+        """ Give the turn to a seat. """
+
+        self._key ^= self._zobrist.turn[self._current] ^ self._zobrist.turn[seat]
+        self._current = seat
+
+    # -- Tiles ---------------------------------------------------------------
+
+    def _deal_card(self, seat):
+        """ Deal a random tile from the pile, or the dragon if it is empty. """
+
+        pile = self._pile
+        if pile:
+            index = self._rng.randrange(len(pile))
+            tile = pile[index]
+            if self._pile_ops is not None:
+                self._pile_ops.append((len(pile), index, tile))
+            pile[index] = pile[-1]
+            pile.pop()
+            self._hands[seat].append(tile)
+            self._key ^= self._zobrist.hand[seat * self._catalogue.count + tile]
+        elif self._dragon == -1:
+            self._dragon = seat
+            self._key ^= self._zobrist.dragon[seat]
+            self._dragon_events.append((self._turns, seat, True))
+
+    def reveal(self, seat, tiles):
+        """ Make a seat hold the given tiles: each one it lacks trades
+            places with a tile of its hand that was not given, in the pile
+            or another hand. A table client, which is only shown its own
+            hand, deals the others at random and corrects them this way as
+            tiles turn up. Undo history starts over. """
+
+        self.unshare()
+        hand = self._hands[seat]
+        spare = [tile for tile in hand if tile not in tiles]
+        hand_keys = self._zobrist.hand
+        count = self._catalogue.count
+        for tile in tiles:
+            if tile in hand:
+                continue
+            holder = -1
+            for other, other_hand in enumerate(self._hands):
+                if tile in other_hand:
+                    holder = other
+            if not spare or holder == -1 and tile not in self._pile:
+                raise ValueError("seat " + str(seat) + " cannot hold tile " +
+                    str(tile))
+            swapped = spare.pop()
+            hand[hand.index(swapped)] = tile
+            self._key ^= hand_keys[seat * count + swapped] ^ \
+                hand_keys[seat * count + tile]
+            if holder == -1:
+                self._pile[self._pile.index(tile)] = swapped
+            else:
+                other_hand = self._hands[holder]
+                other_hand[other_hand.index(tile)] = swapped
+                self._key ^= hand_keys[holder * count + tile] ^ \
+                    hand_keys[holder * count + swapped]
+        self.keep_history(self._history is not None)
+
+    def _return_dragon(self):
+        """ Put the dragon tile back in the pile. """
+
+        self._dragon_events.append((self._turns, self._dragon, False))
+        self._key ^= self._zobrist.dragon[self._dragon]
+        self._dragon = -1
+
+    def _replenish_hand(self, seat):
+        """ The dragon holder draws first when the pile refills; otherwise
+            top a short hand up to 3 tiles. """
+
+        if self._dragon == seat and self._pile:
+            self._return_dragon()
+            self._deal_card(seat)
+
+        if self._dragon == -1 and self._pile and \
+            len(self._hands[seat]) < HAND_SIZE:
+            self._deal_card(seat)
+
+    def _start_turn(self):
+        """ Refill the current seat's hand; seats left without tiles pass. """
+
+        for _ in range(self._num_players):
+            self._replenish_hand(self._current)
+            if self._hands[self._current]:
+                return
+            self._set_current(self.next_seat(self._current))
+
+    def copy(self, rng=None):
+        """ Return an independent engine in the same state. Without an rng
+            the copy draws the same tiles this engine would.
+
+            The two engines share their state lists until either one plays,
+            so copies that are only looked at (snapshots) cost no copying. """
+
+        other = Engine.__new__(Engine)
+        other.__dict__.update(self.__dict__)
+        if rng is None:
+            self._rng_shared = other._rng_shared = True
+        else:
+            other._rng = rng
+            other._rng_shared = False
+        self._shared = other._shared = True
+        other._history = None
+        other._undone = []
+        other._rng_origin = None
+        return other
+
+    def unshare(self):
+        """ Give this engine its own state lists and random number generator
+            before it changes them. Every public method that changes the
+            engine calls it first; the private helpers that change single
+            fields only run inside those. """
+
+        if self._rng_shared:
+            rng = random.Random.__new__(random.Random)
+            rng.setstate(self._rng.getstate())
+            self._rng = rng
+            self._rng_shared = False
+        if not self._shared:
+            return
+        self._board = self._board[:]
+        self._rotation = self._rotation[:]
+        self._links = self._links[:]
+        self._markers = self._markers[:]
+        self._facing = self._facing[:]
+        self._alive = self._alive[:]
+        self._starts = self._starts[:]
+        self._pile = self._pile[:]
+        self._hands = [hand[:] for hand in self._hands]
+        self._dragon_events = self._dragon_events[:]
+        self._moves = self._moves[:]
+        self._shared = False
+
+    def snapshot(self):
+        """ Return a frozen copy of the position to restore later. """
+
+        return self.copy()
+
+    def restore(self, snapshot):
+        """ Go back to a position saved by snapshot; the snapshot can be
+            restored again. Undo history starts over. """
+
+        keep = self._history is not None
+        self.__dict__.update(snapshot.copy().__dict__)
+        self.keep_history(keep)
+
+    def __getstate__(self):
+        # Pickles (saved games, search workers) leave out what can be
+        # rebuilt: the board tables, Zobrist tables and the slot to seat
+        # index, and the undo history
+        state = self.__dict__.copy()
+        del state['_geometry'], state['_zobrist'], state['_facing']
+        state['_size'] = self._geometry.size
+        state['_shared'] = state['_rng_shared'] = False
+        state['_history'] = state['_rng_origin'] = None
+        state['_undone'] = []
+        return state
+
+    def __setstate__(self, state):
+        geometry = self._geometry = board_geometry(state.pop('_size'))
+        self.__dict__.update(state)
+        # Saves made before undo kept pile changes lack these
+        self._rng_origin = self._pile_ops = None
+        self._zobrist = zobrist_tables(geometry.cells, geometry.slots,
+            self._catalogue.count)
+        self._facing = [-1] * geometry.slots
+        for seat, slot in enumerate(self._markers):
+            if slot != -1:
+                self._facing[slot] = seat
+
+    # -- Undo ----------------------------------------------------------------
+
+    def keep_history(self, keep=True):
+        """ Start recording a Delta for every marker placement and move so
+            they can be undone, or stop and forget them. Copies never keep
+            history, so search does not pay for it. """
+
+        self._history = [] if keep else None
+        self._undone = []
+        self._rng_origin = self._rng.getstate() if keep else None
+
+    def _begin_delta(self, seat, action):
+        """ Return the Delta of a change about to happen, or None without
+            history. Playing the action redo would play keeps the rest of
+            the redo list; any other action drops it. """
+
+        if self._history is None:
+            return None
+        if self._undone and self._undone[-1] == action:
+            self._undone.pop()
+        else:
+            self._undone = []
+        delta = Delta(self, seat, action)
+        self._pile_ops = delta.pile_ops
+        return delta
+
+    def _end_delta(self, delta):
+        if delta is not None:
+            delta.trim(self)
+            self._history.append(delta)
+            self._pile_ops = None
+
+    def _rewind_rng(self):
+        """ Put the random number generator where the history leaves it: back
+            to its state when history started, then through the same draws. """
+
+        rng = self._rng
+        rng.setstate(self._rng_origin)
+        for delta in self._history:
+            for op in delta.pile_ops:
+                if not isinstance(op, int):
+                    rng.randrange(op[0])
+
+    def history(self):
+        """ Return (seat, action) for every change that can be undone. """
+
+        return [(delta.seat, delta.action) for delta in self._history or ()]
+
+    def undo(self):
+        """ Take back the last marker placement or move and return its
+            Delta, or None when there is nothing to undo. """
+
+        if not self._history:
+            return None
+        self.unshare()
+        delta = self._history.pop()
+
+        if len(delta.action) == 3:
+            cell = delta.action[2]
+            self._board[cell] = -1
+            self._rotation[cell] = 0
+            for slot in self._geometry.port_slot[cell * 8:cell * 8 + 8]:
+                self._links[slot] = -1
+            self._moves.pop()
+
+        # Put the changed markers back, then index every slot they touched
+        touched = set()
+        for seat, slot in delta.markers:
+            touched.update((self._markers[seat], slot))
+            self._markers[seat] = slot
+        touched.discard(-1)
+        for slot in touched:
+            self._facing[slot] = -1
+        for seat, slot in enumerate(self._markers):
+            if slot in touched:
+                self._facing[slot] = seat
+
+        for seat, index in delta.starts:
+            self._starts[seat] = index
+        for seat, hand in delta.hands:
+            self._hands[seat] = hand[:]
+        for seat in delta.eliminated:
+            self._alive[seat] = True
+        self._alive_count += len(delta.eliminated)
+        # Undo the swap removes and returns, newest first
+        pile = self._pile
+        for op in reversed(delta.pile_ops):
+            if isinstance(op, int):
+                del pile[len(pile) - op:]
+                continue
+            size, index, tile = op
+            if index < size - 1:
+                pile.append(pile[index])
+                pile[index] = tile
+            else:
+                pile.append(tile)
+        self._rewind_rng()
+        self._dragon = delta.dragon
+        del self._dragon_events[delta.dragon_events:]
+        self._current = delta.current
+        self._placed = delta.placed
+        self._turns = delta.turns
+        self._key = delta.key
+
+        self._undone.append(delta.action)
+        return delta
+
+    def redo_action(self):
+        """ Return the action redo would play, or None. """
+
+        return self._undone[-1] if self._undone else None
+
+    def redo(self):
+        """ Play the last undone action again and return it, or None. """
+
+        action = self.redo_action()
+        if action is None:
+            return None
+        if len(action) == 2:
+            self.place_marker(*action)
+        else:
+            self.apply_move(action)
+        return action
+
+    # -- Queries -------------------------------------------------------------
+
+    def is_terminal(self):
+        """ Return True once at most one player is left, or nobody still in
+            the game has a tile to play and the pile is empty. """
+
+        if self._placed < self._num_players:
+            return False
+        if self._alive_count <= 1:
+            return True
+        # Eliminated seats have empty hands
+        return not self._pile and not any(self._hands)
+
+    def winner(self):
+        """ Return the winning seat, or None while playing or on a tie. """
+
+        if not self.is_terminal():
+            return None
+        alive = [seat for seat in range(self._num_players) if self._alive[seat]]
+        return alive[0] if len(alive) == 1 else None
+
+    def key(self):
+        """ Return the Zobrist key of the position: placed tiles, markers,
+            hands, the dragon holder and the seat to move. """
+
+        return self._key
+
+    def compute_key(self):
+        """ Return the Zobrist key worked out from scratch (for checking). """
+
+        zobrist = self._zobrist
+        tiles = self._catalogue.count
+        slots = self._geometry.slots
+        key = zobrist.turn[self._current]
+        for cell in range(self._geometry.cells):
+            if self._board[cell] != -1:
+                key ^= zobrist.cell[
+                    (cell * tiles + self._board[cell]) * 4 + self._rotation[cell]]
+        for seat in range(self._num_players):
+            if self._markers[seat] != -1:
+                key ^= zobrist.marker[seat * slots + self._markers[seat]]
+            for tile in self._hands[seat]:
+                key ^= zobrist.hand[seat * tiles + tile]
+        if self._dragon != -1:
+            key ^= zobrist.dragon[self._dragon]
+        return key
+
+    def catalogue(self):
+        return self._catalogue
+
+    def geometry(self):
+        """ Return the Geometry (lookup tables) of the engine's board. """
+
+        return self._geometry
+
+    def size(self):
+        """ Return the number of cells along each side of the board. """
+
+        return self._geometry.size
+
+    def spots(self):
+        """ Return the number of border start spots (48 on 6x6). """
+
+        return len(self._geometry.border)
+
+    def num_players(self):
+        return self._num_players
+
+    def current_seat(self):
+        return self._current
+
+    def turns(self):
+        return self._turns
+
+    def moves(self):
+        """ Return the (tile, rotation, cell) moves played so far. """
+
+        return list(self._moves)
+
+    def hand(self, seat):
+        return list(self._hands[seat])
+
+    def pile_size(self):
+        return len(self._pile)
+
+    def dragon_holder(self):
+        return self._dragon
+
+    def dragon_events(self):
+        """ Return (turn, seat, taken) for each time the dragon changed hands. """
+
+        return list(self._dragon_events)
+
+    def marker(self, seat):
+        """ Return the point the seat's marker is on, -1 before placement. """
+
+        slot = self._markers[seat]
+        return slot >> 1 if slot != -1 else -1
+
+    def start_spot(self, seat):
+        """ Return the border spot the seat started on, or -1. """
+
+        return self._starts[seat]
+
+    def marker_slot(self, seat):
+        """ Return the slot the seat's marker faces from, -1 before placement. """
+
+        return self._markers[seat]
+
+    def still_in(self, seat):
+        return self._alive[seat]
+
+    def cell(self, cell):
+        """ Return (tile, rotation) placed on a cell, tile -1 when empty. """
+
+        return self._board[cell], self._rotation[cell]
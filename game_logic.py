@@ -1,7 +1,18 @@
-from random import choice
+import os
+import random
+
 from arcadegraphics import *
-from constants import WIN_WIDTH, WIN_HEIGHT, BOARD_LEN, IMG_DIR
-from helpers import load_matches
+from constants import WIN_WIDTH, WIN_HEIGHT, BOARD_LEN, IMG_DIR, \
+    BOARD_SIZE, TILE_SET, CELL_COORDS, PORT_SHIFTS, COMPUTER_PLAYERS, \
+    COMPUTER_TIME_LIMIT, COMPUTER_DELAY, GAME_SEED, MOVE_LOG_DIR, \
+    AUTOSAVE_PATH, SERVER_ADDRESS, SERVER_TABLE, SERVER_POLL
+from helpers import load_tile_set
+from engine import Engine, board_geometry
+from movelog import LogWriter, MoveLog, decode_move, encode_move
+from policies import make_policy
+
+# Seconds a computer player thinks between two frames of the window
+THINK_STEP = 1 / 60
 
 
 class Game:
@@ -21,14 +32,44 @@ class Game:
         self._ink = '#2f2a1e'         # text/border ink
         self._accent_blue = '#6B8BA4' # subtle selection accent
 
-        # Dicationaries that controls markers' movement
-        # Need 2 dict - each spot on the board corresponds to two other spots
-        self._loc_dict1 = {}
-        self._loc_dict2 = {}
-
-        # Location logic keys for each tile
-        # 8 spots that make 4 connection pairs per rotation, 4 rotation per tile
-        self._coord_list = load_matches()
+        # The rules engine is made once the number of players is known, its
+        # random numbers come from the game's seed
+        self._engine = None
+        self._seed = None
+        # Append the game to the autosave and MOVE_LOG_DIR move log files
+        self._log_paths = []
+        self._log_writers = []
+        # True while a saved game or redone moves are played back into the
+        # window
+        self._resuming = False
+        # Set once the tiles and cells take clicks; the win or tie message
+        self._started = False
+        self._result = []
+        # Computer players by seat, and the move search of the one thinking
+        self._computers = {}
+        self._thinking = None
+        # At a server table: the connection, this window's seat and the
+        # seats the other clients play
+        self._client = None
+        self._seat = None
+        self._remote = set()
+
+        # Location logic for each tile, compiled from TILE_SET
+        # 8 ports that make 4 connection pairs per rotation, 4 rotation per tile
+        self._catalogue = load_tile_set(TILE_SET)
+        # Board cells, border spots and points for BOARD_SIZE
+        self._geometry = board_geometry(BOARD_SIZE)
+        # Tile pictures; sets other than matches.txt are drawn once (Pillow)
+        self._tile_dir = IMG_DIR
+        if TILE_SET != 'matches.txt':
+            from snapshot import tile_image_dir
+            self._tile_dir = tile_image_dir(TILE_SET, self._catalogue)
+
+        # Load every image once; later games in this process reuse them
+        self._win.preload_textures(
+            [IMG_DIR + '/bkg2.png', IMG_DIR + '/board.jpg',
+            IMG_DIR + '/dragon.jpg'] + [self._tile_dir + '/' + str(n) + '.jpg'
+            for n in range(self._catalogue.count)])
 
         # Adding background image
         self._bkg = Image(
@@ -50,22 +91,25 @@ class Game:
 
         # Make all the tiles ready to use
         self._tiles = [
-            Tile(self._win, self, n, self._coord_list[n]) for n in range(35)]
+            Tile(self._win, self, n, self._tile_dir)
+            for n in range(self._catalogue.count)]
+
+        # The hand tile clicked for placing, if any
+        self._selected = None
 
         # Make dragon tile, and add it to the overall list
         self._dragon = Dragon(self._win, self)
         self._all_tiles = self._tiles + [self._dragon]
 
         # Making a popup window to get the amount of players
-        Popup(self._win, self)
+        self._popup = Popup(self._win, self)
 
         # Prepare (but do not yet show) the initial prompt window; it will be
         # displayed after players choose the player count.
         self._initial_msg = self.initial_view()
 
         # Make the cells on the board
-        side_coord = [150, 250, 350, 450, 550, 650]
-        cell_coord = [(x, y) for x in side_coord for y in side_coord]
+        cell_coord = [(x, y) for x in CELL_COORDS for y in CELL_COORDS]
         self._cells = [Cell(self._win, self, coord) for coord in cell_coord]
 
         # Make warnings for illegal placement of pieces and tiles
@@ -96,55 +140,186 @@ class Game:
         for element in self._warn_placement:
             self._win.add(element)
 
+        # Messages of the table server, above the other warnings
+        w_server_box = Rectangle(self._win, 600, 50, (-1100, -680))
+        w_server_box.set_fill_color(self._parchment)
+        w_server_box.set_border_color(self._ink)
+        w_server_box.set_depth(2)
+        w_server_text = Text(self._win, "SERVER:", 15, (-1100, -680))
+        w_server_text.set_depth(1)
+        self._warn_server = [w_server_box, w_server_text]
+        for element in self._warn_server:
+            self._win.add(element)
+
+        # CTRL+Z and CTRL+Y undo and redo placements
+        self._win.add_key_handler(self)
+
+        if SERVER_ADDRESS is not None:
+            # Play at a table on a server, which keeps the game
+            from client import ClientThread
+            self._client = ClientThread(*SERVER_ADDRESS)
+            self.poll_server()
+        else:
+            # Pick up a game that a crash interrupted
+            self.recover()
+
+    def recover(self):
+        """ Resume the autosaved game if the last one did not finish. """
+
+        if AUTOSAVE_PATH is None or not os.path.exists(AUTOSAVE_PATH):
+            return
+        try:
+            log = MoveLog.load(AUTOSAVE_PATH)
+            # Check the whole log before touching the window; a game on
+            # another board size is left alone
+            if log.size != BOARD_SIZE:
+                return
+            log.replay(self._catalogue)
+        except (OSError, ValueError):
+            return
+        self.resume(log)
+
+    def resume(self, log):
+        """ Bring a game back from its move log, making the same calls a
+            computer player makes but without the delays. """
+
+        self._popup.close()
+        self.play_log(log)
+
+    def play_log(self, log, starts=None):
+        """ Play a game's move log into the window, starting with the given
+            start spots (default: the log's). """
+
+        self._resuming = True
+        self.make_players(log.players, log.seed)
+        self.display_initial_view()
+        for seat, index in enumerate(log.starts if starts is None else starts):
+            self._players_list[seat].set_start(index)
+        for tile_id, rotation, cell_index in log.moves:
+            tile = self._tiles[tile_id]
+            tile.set_rotation(rotation)
+            self.place_tile(tile, self._cells[cell_index])
+        self._resuming = False
+        self.hand_over()
+
+    def choose_players(self, number):
+        """ Start a game of the number of players chosen in the popup, or
+            ask the server for a seat at its table (made for that many
+            players if it is new). """
+
+        if self._client is None:
+            self.make_players(number)
+            self.display_initial_view()
+        else:
+            self._client.send(
+                {'op': 'join', 'table': SERVER_TABLE, 'players': number})
+
+    def poll_server(self):
+        """ Play the table's messages received since the last poll, then
+            poll again after SERVER_POLL seconds. """
+
+        for message in self._client.received():
+            self.server_message(message)
+        self._win.call_later(self.poll_server, SERVER_POLL)
+
+    def server_message(self, message):
+        """ Show the game so far once seated, then the start spots and
+            moves of the other clients' seats, and this seat's hand. """
+
+        op = message['op']
+        if op in ('joined', 'start', 'move'):
+            self.hide_warning_server()
+        if op == 'joined':
+            if message['size'] != BOARD_SIZE or \
+                message['tiles'] != self._catalogue.digest:
+                self.show_warning_server(
+                    "table plays another board size or tile set")
+                return
+            self._seat = message['seat']
+            self._remote = set(range(message['players'])) - {self._seat}
+            # The server keeps the seed, the engine deals at random
+            self.play_log(MoveLog(None, message['players'], message['starts'],
+                [decode_move(code, self._geometry.cells)
+                for code in message['moves']],
+                BOARD_SIZE, self._catalogue.count))
+        elif op == 'start':
+            self.play_action((message['seat'], message['spot']))
+        elif op == 'move':
+            self.play_action(
+                decode_move(message['move'], self._geometry.cells))
+        elif op == 'error':
+            self.show_warning_server(message['reason'])
+        if 'hand' in message and self._seat is not None:
+            self.take_hand(message['hand'])
+
+    def take_hand(self, hand):
+        """ Give this window's seat the hand the server says it holds. The
+            engine only guesses the hidden tiles, so the hand shown on the
+            screen is drawn again. """
+
+        player_id = str(self._seat + 1)
+        engine = self._engine
+        if engine.in_setup():
+            shown = engine.start_spot(self._seat) == -1
+            depth = 15 + int(player_id)
+        else:
+            shown = not engine.is_terminal() and \
+                engine.current_seat() == self._seat
+            depth = 10
+        if shown:
+            self.hide_hand(player_id)
+        engine.reveal(self._seat, hand)
+        if shown:
+            self.display_hand(player_id, depth)
+
+    def tell_server(self, seat, message):
+        """ Send a start spot or move of this window's seat to the table. """
+
+        if self._client is not None and seat == self._seat and \
+            not self._resuming:
+            self._client.send(message)
+
+    def hand_over(self):
+        """ Let a computer player whose decision is next go ahead. """
+
+        if self._engine.in_setup():
+            player = self._players_list[self.setup_seat()]
+            if self.is_computer(player.return_id()):
+                self.later(lambda: self.computer_start(player))
+        elif not self._engine.is_terminal() and self.computer_turn():
+            self.later(self.computer_move)
+
+    def later(self, function):
+        """ Call a computer player's step after COMPUTER_DELAY, unless the
+            game is being resumed from its log. """
+
+        if not self._resuming:
+            self._win.call_later(function, COMPUTER_DELAY)
+
     def run(self):
         """ The main game squence, after all the inital prep is done. """
 
-        # Add handlers for all cells and tiles to make them clickable:
-        for cell in self._cells:
-            cell.give_handler()
-        for tile in self._tiles:
-            tile.give_handler()
+        # Add handlers for all cells and tiles to make them clickable, once
+        # (a redo of the last start spot runs this again)
+        if not self._started:
+            self._started = True
+            for cell in self._cells:
+                cell.give_handler()
+            for tile in self._tiles:
+                tile.give_handler()
 
-        # Start the game with player1
-        self.game_cycle("1")
+        starts = MoveLog.from_engine(self._seed, self._engine).starts
+        for writer in self._log_writers:
+            writer.write_starts(starts)
 
-    def game_cycle(self, player_id):
-        """ The main cycle of games, gives each active player turns to go. """
+        # Start the game with whoever the engine gives the first turn
+        self.game_cycle(self._engine.current_seat())
 
-        for player in self._players_list:
-            if player.return_id() == player_id:
-                current_player = player
+    def game_cycle(self, seat):
+        """ The main cycle of games, gives each active player turns to go. """
 
         # Display in game prompt for each individual player
-        self.show_in_game(current_player)
-
-    def replenish_hand(self, player):
-        """ If the current player has a dragon tile and the pile is not empty,
-            initiate a refill process for everyone. """
-
-        # Counting how many tiles are in the pile
-        pile = 0
-        for tile in self._tiles:
-            if tile.return_status() == "pile":
-                pile += 1
-
-        # If tiles are avaliable when a player has the dragon tile,
-        # Return the dragon tile and draw a tile
-        if self._dragon.return_status() == player.return_id() and pile > 0:
-            self._dragon.change_status("pile")
-            self.deal_card(player.return_id())
-            pile -= 1
-
-        # If there's are avalible tiles in pile and player's hand has less than
-        # 3 tiles, draw a tile
-        if self._dragon.return_status() == "pile" and pile > 0:
-            tile_counter = 0
-            for tile in self._tiles:
-                if tile.return_status() == player.return_id():
-                    tile_counter += 1
-
-            if tile_counter < 3:
-                self.deal_card(player.return_id())
+        self.show_in_game(self._players_list[seat])
 
     def show_in_game(self, player):
         """ Show in-game prompt and player's tiles. """
@@ -152,129 +327,181 @@ class Game:
         # Display in-game prompt (playerID's turn and how to place a tile)
         player.display_in_game_prompt()
 
-        # Check conditions to see if there's avalible tiles for player
-        self.replenish_hand(player)
+        # Display player's tiles, the engine already refilled the hand; the
+        # hands of other clients' seats are not known here
+        if not self.is_remote(player.return_id()):
+            self.display_hand(player.return_id(), 10)
+
+        # Computer players think between frames so the window stays alive
+        seat = int(player.return_id()) - 1
+        if seat in self._computers:
+            self.later(self.computer_move)
+
+    def computer_move(self):
+        """ Let the computer player whose turn it is think for one step, and
+            place its tile once it has chosen; the window draws in between. """
+
+        if self._thinking is None:
+            self._thinking = self._computers[
+                self._engine.current_seat()].move_steps(
+                self._engine, THINK_STEP)
+        try:
+            next(self._thinking)
+        except StopIteration as done:
+            move = done.value
+        else:
+            self._win.call_later(self.computer_move)
+            return
+        self._thinking = None
+        tile_id, rotation, cell_index = move
+        tile = self._tiles[tile_id]
+        tile.set_rotation(rotation)
+        self.place_tile(tile, self._cells[cell_index])
 
-        # Display player's tiles
-        self.display_hand(player.return_id(), 10)
+    def computer_start(self, player):
+        """ Let a computer player choose its starting spot. """
 
-    def hide_in_game(self, player_id):
-        """ Hide in-game prompt and player's tiles. Trigger movement. """
+        seat = int(player.return_id()) - 1
+        player.set_start(self._computers[seat].choose_start(self._engine, seat))
 
-        # Find the current player
-        for player in self._players_list:
-            if player.return_id() == player_id:
-                current_player = player
+    def setup_seat(self):
+        """ Return the seat choosing its start spot during setup. """
 
-        # Hide the prompt and hand for this player
-        current_player.hide_in_game_prompt()
-        self.hide_hand(player_id)
+        return self._engine.setup_seat()
 
-        # Deal additional card:
-        self.deal_card(player_id)
+    def computer_on_move(self):
+        """ Return True while a computer player is to choose a start spot
+            or place a tile. """
 
-        # Move player markers and update the list for players still in the game
-        self.move_markers()
-        self.update_active_player_list()
+        if self._engine.in_setup():
+            return self.setup_seat() in self._computers
+        return not self._engine.is_terminal() and self.computer_turn()
 
-        # Import winner/tie functions
-        from ui_components import winner, tie
+    def is_computer(self, player_id):
+        """ Return True if the computer plays this player. """
 
-        # Check number of active players left, and decide win/tie/continue
-        players_count = len(self._active_players)
-        if  players_count == 0:
-            tie(self._win)
-        elif players_count == 1:
-            winner(self._win, self._active_players[0].return_id())
-        else:
+        return int(player_id) - 1 in self._computers
 
-            # Find who should be the next to go after the current player
-            index_counter = self._players_list.index(current_player)
-            index_counter += 1
-            temp_list = []
-            while index_counter < len(self._players_list):
-                if self._players_list[index_counter].still_in():
-                    temp_list.append(self._players_list[index_counter])
-                    index_counter += 1
-
-            temp_len = len(temp_list)
-            if temp_len == 0:
-                self.game_cycle(self._active_players[0].return_id())
-            else:
-                self.game_cycle(temp_list[0].return_id())
+    def is_remote(self, player_id):
+        """ Return True if another client at the server table plays this
+            player. """
 
-    def move_markers(self):
-        """ Check to see if players marker can move and if this move will
-            eliminate these players. """
+        return int(player_id) - 1 in self._remote
 
-        for player in self._active_players:
+    def remote_turn(self):
+        """ Return True while another client's seat is on the move. """
 
-            # Check both dicationary to see if player can move
-            while self.moveable1(player) or self.moveable2(player):
+        return self._engine.current_seat() in self._remote
 
-                # If a moveable, mathing coordinate is found in dicationary1
-                if self.moveable1(player) and not self.moveable2(player):
-                    new_loc = self._loc_dict1[player.return_current_loc()]
-                    player.move_player(new_loc)
-                    player.update_location(new_loc)
+    def computer_turn(self):
+        """ Return True while a computer player is on the move. """
 
-                # If a moveable, mathing coordinate is found in dicationary1
-                if self.moveable2(player) and not self.moveable1(player):
-                    new_loc = self._loc_dict2[player.return_current_loc()]
-                    player.move_player(new_loc)
-                    player.update_location(new_loc)
+        return self._engine.current_seat() in self._computers
 
-            # Check if any player is eliminated
-            self.check_elimination(player)
+    def hide_in_game(self, player_id):
+        """ Hide in-game prompt and player's tiles. """
 
-    def check_elimination(self, player):
-        """ Check if a player is eliminated, put back all the unused tiles. """
+        self._players_list[int(player_id) - 1].hide_in_game_prompt()
+        self.hide_hand(player_id)
 
-        # Make sure we are not eliminating players before their first turn
-        if player.return_current_loc() in player.return_border() and \
-            len(player.hist()) != 1:
-            player.eliminated()
+    def finish_turn(self):
+        """ Move the markers after a placement and decide win/tie/continue. """
 
-            # "Put back" all the tiles of this player to the pile
-            for tile in self._all_tiles:
-                if tile.return_status() == player.return_id():
-                    tile.change_status("pile")
+        # Move player markers and update the list for players still in the game
+        self.move_markers()
+        self.update_active_player_list()
+
+        # Import winner/tie functions
+        from ui_components import winner, tie
 
-    def moveable1(self, player):
-        """ Return a boolean for if loc_dict1 has key matching the location. """
+        if self._engine.is_terminal():
+            for writer in self._log_writers:
+                writer.close()
+            self._log_writers = []
+            # A finished game has nothing to recover
+            if AUTOSAVE_PATH is not None and os.path.exists(AUTOSAVE_PATH):
+                os.remove(AUTOSAVE_PATH)
+            winner_seat = self._engine.winner()
+            if winner_seat is None:
+                self._result = tie(self._win)
+            else:
+                self._result = winner(
+                    self._win, self._players_list[winner_seat].return_id())
+        else:
+            self.game_cycle(self._engine.current_seat())
 
-        if self._loc_dict1.get(player.return_current_loc(), 'no') != 'no' and \
-            self._loc_dict1[player.return_current_loc()] not in player.hist():
-            return True
+    def move_markers(self):
+        """ Show every marker where the engine left it, remove eliminated
+            players' markers. """
+
+        for seat, player in enumerate(self._players_list):
+            if not player.still_in():
+                continue
+            if self._engine.still_in(seat):
+                location = self.point_location(self._engine.marker(seat))
+                player.move_player(location)
+                player.update_location(location)
+            else:
+                player.eliminated()
 
-        return False
+    def point_location(self, point):
+        """ Return the pixel location of an engine point. """
 
-    def moveable2(self, player):
-        """ Return a boolean for if loc_dict2 has key matching the location. """
+        cell, port = self._geometry.point_cells[point][0]
+        center = self._cells[cell].get_location()
+        shift = PORT_SHIFTS[port - 1]
+        return (center[0] + shift[0], center[1] + shift[1])
 
-        if self._loc_dict2.get(player.return_current_loc(), 'no') != 'no' and \
-            self._loc_dict2[player.return_current_loc()] not in player.hist():
-            return True
+    def start_locations(self):
+        """ Return the pixel locations of the border spots in engine order. """
 
-        return False
+        return [self.point_location(point) for point in self._geometry.border]
 
-    def make_players(self, num):
+    def make_players(self, num, seed=None):
         """ Make players based on popup (1-8), though we can't play with 1. """
 
         from players import Player
 
+        # The engine deals 3 tiles to each player
+        if seed is None:
+            seed = GAME_SEED if GAME_SEED is not None \
+                else random.getrandbits(64)
+        self._seed = seed
+        self._engine = Engine(num, self._catalogue, random.Random(seed),
+            BOARD_SIZE)
+        self._engine.keep_history()
+        # The server keeps table games and their seeds, nothing to log
+        self._log_paths = [AUTOSAVE_PATH] \
+            if AUTOSAVE_PATH is not None and self._client is None else []
+        if MOVE_LOG_DIR is not None and self._client is None:
+            os.makedirs(MOVE_LOG_DIR, exist_ok=True)
+            self._log_paths.append(
+                os.path.join(MOVE_LOG_DIR, str(seed) + '.tsl'))
+        self.open_logs()
+
         for counts in range(num):
             self._players_list.append(Player(self._win, counts, self))
         self.update_active_player_list()
 
-        # Deal 3 tiles to each player
-        for _ in range(3):
-            for player in self._active_players:
-                self.deal_card(player.return_id())
+        # Seats listed in constants are played by the computer, unless
+        # another client plays them
+        for player_id, name in COMPUTER_PLAYERS.items():
+            if int(player_id) <= num and \
+                int(player_id) - 1 not in self._remote:
+                options = {'time_limit': COMPUTER_TIME_LIMIT} \
+                    if name.startswith('mcts') else {}
+                self._computers[int(player_id) - 1] = make_policy(
+                    name, **options)
 
         # Show player's hand so they can better decide where to start
         for player in self._active_players:
-            self.display_hand(player.return_id(), 15 + int(player.return_id()))
+            if not self.is_remote(player.return_id()):
+                self.display_hand(
+                    player.return_id(), 15 + int(player.return_id()))
+
+        # The first player might be the computer
+        if 0 in self._computers:
+            self.later(lambda: self.computer_start(self._players_list[0]))
 
     def update_active_player_list(self):
         """ Update the list to all players still in the game. """
@@ -284,19 +511,14 @@ class Game:
             if player.still_in():
                 self._active_players.append(player)
 
-    def deal_card(self, player_id):
-        """ Deal card to players. """
-
-        # Make a list for tiles that can be drawn from the pile
-        avaliable_tiles = [
-            tile for tile in self._tiles if tile.return_status() == "pile"]
+    def hand_tiles(self, player_id):
+        """ Return the tile objects (dragon included) in a player's hand. """
 
-        if avaliable_tiles:
-            chosen_t = choice(avaliable_tiles)
-            chosen_t.change_status(player_id)
-        else:
-            if self._dragon.return_status() == "pile":
-                self._dragon.change_status(player_id)
+        seat = int(player_id) - 1
+        tiles = [self._tiles[n] for n in self._engine.hand(seat)]
+        if self._engine.dragon_holder() == seat:
+            tiles.append(self._dragon)
+        return tiles
 
     def display_hand(self, player_id, depth):
         """ Display the player's hand. """
@@ -306,7 +528,7 @@ class Game:
         tile_2_loc = [(1000, 400), (1200, 400)]
         tile_1_loc = (1100, 400)
 
-        tiles = [t for t in self._all_tiles if t.return_status() == player_id]
+        tiles = self.hand_tiles(player_id)
         for tile in tiles:
             tile.change_depth(depth)
 
@@ -326,10 +548,9 @@ class Game:
 
         hidden_loc = (-400, -400)
 
-        for tile in self._all_tiles:
-            if tile.return_status() == player_id:
-                tile.change_depth(30)
-                tile.move_location(hidden_loc)
+        for tile in self.hand_tiles(player_id):
+            tile.change_depth(30)
+            tile.move_location(hidden_loc)
 
     def display_initial_view(self):
         """ Display the prompt window for intial marker selection. """
@@ -343,6 +564,13 @@ class Game:
         for element in self._initial_msg:
             self._win.remove(element)
 
+    def restore_initial_view(self):
+        """ Bring the initial prompt window back when setup is undone. """
+
+        for element in self._initial_msg:
+            self._win.add(element)
+        self.display_initial_view()
+
     def initial_view(self):
         """ Make a window to prompt players to look at their tiles. """
 
@@ -364,102 +592,234 @@ class Game:
 
         return self._active_players[-1].return_id() == player_id
 
+    def start_spot_set(self, player_id):
+        """ A player has set their marker; start the game after the last one,
+            or let the next player choose. """
+
+        # If this is the last player to finish set up, then run game
+        if self.last_on_the_list(player_id):
+            self.remove_initial_view()
+            self.run()
+        elif int(player_id) in self._computers:
+            next_player = self._players_list[int(player_id)]
+            self.later(lambda: self.computer_start(next_player))
+
     def send_tile_to_me(self, cell):
         """ Sends a clicked Tile (if there is one) to this Cell object. """
 
+        # Clicks do nothing while the computer or another client is on the move
+        if self.computer_turn() or self.remote_turn():
+            return
+
         tile = self.get_clicked_tile()
         if tile is not None:
             if self.legal_placement(cell, tile):
-                current_player_id = tile.return_status()
-
                 # This is a extra line just to keep warning signs off the screen
                 self.hide_warning_tile_placement()
-                self.move_tile_to_cell(tile, cell)
-
-                # Create a layer so this particular cell becomes unclickable
-                cell.create_unclickable_layer()
-
-                # Hide prompts, the called method start turn for the next player
-                self.hide_in_game(current_player_id)
+                self.place_tile(tile, cell)
             else:
                 self.show_warning_tile_placement()
 
+    def place_tile(self, tile, cell):
+        """ Play a legal placement for the current player and pass the turn. """
+
+        current_player_id = str(self._engine.current_seat() + 1)
+
+        # Hide prompts and hand before the engine deals or eliminates
+        self.hide_in_game(current_player_id)
+        self.move_tile_to_cell(tile, cell)
+
+        # Create a layer so this particular cell becomes unclickable
+        cell.create_unclickable_layer()
+
+        # Move markers, the called method start turn for the next player
+        self.finish_turn()
+
     def get_clicked_tile(self):
         """ Return a Tile object, if one is clicked. """
 
-        for tile in self._tiles:
-            if tile.is_clicked():
-                return tile
+        # A second click unselects the tile itself
+        if self._selected is not None and self._selected.is_clicked():
+            return self._selected
         return None
 
     def legal_placement(self, cell, tile):
         """ Check if the target location is next to this player's marker. """
 
-        # Get this player's piece/marker location
-        player_id = tile.return_status()
-        for player in self._players_list:
-            if player_id == player.return_id():
-                marker_location = player.return_current_loc()
-
-        # Get this cell's location
-        target_loc = cell.get_location()
-        possible_loc = []
-        for shift in [(-17, -50), (16, -50), (-50, -17), (50, -17), (-50, 16), \
-            (50, 16), (-17, 50), (16, 50)]:
-            possible_loc.append(tuple(map(sum, zip(target_loc, shift))))
-
-        # Check to see if marker's location is on any side of the cell
-        if marker_location in possible_loc:
-            return True
-
-        return False
+        move = (tile.return_image_id(), tile.return_rotation(),
+            self._cells.index(cell))
+        return self._engine.is_legal(move)
 
     def unclick_all_other(self, tile_id):
-        """ When one tile is clicked, unclick all other tiles in the list. """
+        """ When one tile is clicked, unclick the one clicked before it; -1
+            unclicks any. """
 
-        for tile in self._tiles:
-            if tile.return_image_id() != tile_id:
-                tile.change_clicked()
+        if self._selected is not None and \
+            self._selected.return_image_id() != tile_id:
+            self._selected.change_clicked()
+        self._selected = self._tiles[tile_id] if tile_id != -1 else None
 
     def move_tile_to_cell(self, tile, cell):
         """ Move the given tile object to the location of the cell object, and
-            trigger all subsequent events. This is 'one move' of a player. """
+            play it in the engine. This is 'one move' of a player. """
 
         location = cell.get_location()
         tile.move_location(location)
         tile.set_still()
 
-        # Call on method to trigger passing of location logic from tile to game
-        self.update_loc_dict(tile.return_coord(), location)
-
-    def update_loc_dict(self, coord, center):
-        """ Use coordinate from the tile, update location dicationary. """
-
-        logic_list = [(-17, -50), (16, -50), (-50, -17), (50, -17)] +\
-            [(-50, 16), (50, 16), (-17, 50), (16, 50)]
-        for pairs in coord:
-            location_a = tuple(map(sum, zip(center, logic_list[pairs[0] - 1])))
-            location_b = tuple(map(sum, zip(center, logic_list[pairs[1] - 1])))
+        move = (tile.return_image_id(), tile.return_rotation(),
+            self._cells.index(cell))
+        seat = self._engine.current_seat()
+        if self._client is not None:
+            # Only the server knows the other hands (and this seat's before
+            # the join); the engine's guess gets the tile played
+            self._engine.reveal(seat, [move[0]])
+        self._engine.apply_move(move)
+        self.tell_server(seat,
+            {'op': 'move', 'move': encode_move(move, self._geometry.cells)})
+        for writer in self._log_writers:
+            writer.write_move(move)
+
+    def move_log(self):
+        """ Return the MoveLog of the game so far. """
+
+        return MoveLog.from_engine(self._seed, self._engine)
+
+    def open_logs(self):
+        """ Start the autosave and move log files over with the game so
+            far, for a new game or after an undo. """
+
+        for writer in self._log_writers:
+            writer.close()
+        log = self.move_log()
+        self._log_writers = [
+            LogWriter(path, log.seed, log.players, log.size, log.tiles)
+            for path in self._log_paths]
+        for writer in self._log_writers:
+            if log.starts:
+                writer.write_starts(log.starts)
+            for move in log.moves:
+                writer.write_move(move)
+
+    def handle_key_press(self, event):
+        """ CTRL+Z undoes a placement, CTRL+Y (or CTRL+SHIFT+Z) redoes it. """
+
+        if not event.control_down():
+            return
+        key = event.get_key()
+        if key == 'Y' or key == 'Z' and event.shift_down():
+            self.redo()
+        elif key == 'Z':
+            self.undo()
+
+    def can_rewind(self):
+        """ Return True when undo and redo may be used: a human player is
+            on the move, or the game is over, and not at a server table. """
+
+        return self._engine is not None and not self._resuming and \
+            self._client is None and not self.computer_on_move()
+
+    def undo(self):
+        """ Take back the last placement of a human player (a start spot or
+            a tile), and the computer players' placements after it. """
+
+        if not self.can_rewind() or all(seat in self._computers
+                for seat, action in self._engine.history()):
+            return
+        self.unclick_all_other(-1)
+        self.hide_warning_overlap()
+        self.hide_warning_tile_placement()
+
+        # Take the turn in progress, or the result, off the screen
+        if self._engine.is_terminal():
+            for element in self._result:
+                self._win.remove(element)
+            self._result = []
+        elif not self._engine.in_setup():
+            self.hide_in_game(str(self._engine.current_seat() + 1))
+
+        while True:
+            started = not self._engine.in_setup()
+            delta = self._engine.undo()
+            self.show_undone(delta, started)
+            if delta.seat not in self._computers:
+                break
+
+        # The autosave and move logs must not keep the undone placements
+        self.open_logs()
+        if not self._engine.in_setup():
+            self.game_cycle(self._engine.current_seat())
+
+    def show_undone(self, delta, started):
+        """ Update the window for an undone engine Delta, touching only the
+            tile, markers and players it changed. """
+
+        if len(delta.action) == 2:
+            # The last start spot had started the game
+            if started:
+                self.restore_initial_view()
+            self._players_list[delta.seat].unset_start()
+            return
+
+        tile_id, rotation, cell_index = delta.action
+        tile = self._tiles[tile_id]
+        tile.change_depth(30)
+        tile.move_location((-400, -400))
+        self._cells[cell_index].remove_unclickable_layer()
+
+        for seat, slot in delta.markers:
+            player = self._players_list[seat]
+            if seat in delta.eliminated:
+                player.rejoin()
+            location = self.point_location(self._engine.marker(seat))
+            player.move_player(location)
+            player.update_location(location)
+        self.update_active_player_list()
 
-            # 2 dicationaries-every spot on the graph can leads to 2 other spots
-            if self._loc_dict1.get(location_a, "no_value") != "no_value":
-                self._loc_dict2[location_a] = location_b
-            else:
-                self._loc_dict1[location_a] = location_b
+    def redo(self):
+        """ Play undone placements again, up to the next decision of a
+            human player. """
+
+        if not self.can_rewind() or self._engine.redo_action() is None:
+            return
+        self.unclick_all_other(-1)
+        self.hide_warning_overlap()
+        self.hide_warning_tile_placement()
+
+        # Replayed like a resumed game, so computer players do not step in
+        self._resuming = True
+        while True:
+            self.play_action(self._engine.redo_action())
+            if self._engine.redo_action() is None or \
+                not self.computer_on_move():
+                break
+        self._resuming = False
+        self.hand_over()
+
+    def play_action(self, action):
+        """ Play a (seat, index) start spot or a (tile, rotation, cell) move
+            through the window, as a player would. """
+
+        if len(action) == 2:
+            seat, index = action
+            self._players_list[seat].set_start(index)
+        else:
+            tile_id, rotation, cell_index = action
+            tile = self._tiles[tile_id]
+            tile.set_rotation(rotation)
+            self.place_tile(tile, self._cells[cell_index])
 
-            if self._loc_dict1.get(location_b, "no_value") != "no_value":
-                self._loc_dict2[location_b] = location_a
-            else:
-                self._loc_dict1[location_b] = location_a
+    def no_overlap(self, index):
+        """ In game setup check if this border spot is free of other markers. """
 
-    def no_overlap(self, location):
-        """ In game setup check if this location is overlapping with others. """
+        return self._engine.start_spot_free(index)
 
-        for player in self._players_list:
-            if player.return_current_loc() == location:
-                return False
+    def place_marker(self, player_id, index):
+        """ Set a player's marker on a border spot in the engine. """
 
-        return True
+        seat = int(player_id) - 1
+        self._engine.place_marker(seat, index)
+        self.tell_server(seat, {'op': 'start', 'spot': index})
 
     def show_warning_overlap(self):
         """ Show warning that prevent players to overlap their markers. """
@@ -484,3 +844,17 @@ class Game:
 
         for element in self._warn_placement:
             element.move_to((-1100, -600))
+
+    def show_warning_server(self, reason):
+        """ Show why the table server refused a message or dropped the
+            connection. """
+
+        self._warn_server[1].set_text("SERVER: " + reason)
+        for element in self._warn_server:
+            element.move_to((1100, 680))
+
+    def hide_warning_server(self):
+        """ Hide the server warning. """
+
+        for element in self._warn_server:
+            element.move_to((-1100, -680))
@@ -1,4 +1,22 @@
 import ast
+import hashlib
+import os
+import pickle
+
+# Compiled catalogues already loaded by this process, keyed by file path
+# (or generated tile set name)
+_catalogues = {}
+
+# Tile sets made in code rather than read from a matches file: one tile for
+# each way of pairing the 8 ports up to rotation (the 35 standard tiles), or
+# every one of the 105 pairings as its own tile
+GENERATED = 'generated'
+GENERATED_ALL = 'generated-all'
+
+# QUARTER_TURN[port - 1] -> port - 1 it moves to when a tile turns once, the
+# way rotations follow each other in matches.txt (counterclockwise)
+QUARTER_TURN = (4, 2, 6, 0, 7, 1, 5, 3)
+
 
 def load_matches(path='matches.txt'):
     coord_list = []
@@ -7,4 +25,149 @@ def load_matches(path='matches.txt'):
             line = line.strip('\n')
             clean_list = ast.literal_eval(line)
             coord_list.append(clean_list)
-    return coord_list
\ No newline at end of file
+    return coord_list
+
+
+class Catalogue:
+    """ Compiled tile set: for each tile and rotation, the port (0-7) that
+        each port (0-7) is connected to. """
+
+    def __init__(self, perms, rotations):
+        """ The Constructor for Catalogue class. """
+
+        # perms[(tile * 4 + rotation) * 8 + port] -> connected port
+        self.perms = perms
+        # rotations[tile] -> rotations that give different connections
+        self.rotations = rotations
+        self.count = len(rotations)
+        # Names the tile set by content, so copies of a catalogue (such as
+        # unpickled ones) share tables made for it
+        self.digest = hashlib.sha1(perms).hexdigest()
+
+    def perm(self, tile, rotation):
+        """ Return the 8 entry port permutation of a tile in a rotation. """
+
+        start = (tile * 4 + rotation) * 8
+        return self.perms[start:start + 8]
+
+
+def turn_pairs(pairs):
+    """ Return a tile's port pairs (ports 1-8) turned a quarter. """
+
+    turned = [(QUARTER_TURN[a - 1] + 1, QUARTER_TURN[b - 1] + 1)
+        for a, b in pairs]
+    return sorted(tuple(sorted(pair)) for pair in turned)
+
+
+def all_rotations(pairs):
+    """ Return the 4 rotations of a tile given by its first one. """
+
+    rotations = [sorted(tuple(sorted(pair)) for pair in pairs)]
+    for _ in range(3):
+        rotations.append(turn_pairs(rotations[-1]))
+    return rotations
+
+
+def port_matchings(ports=(1, 2, 3, 4, 5, 6, 7, 8)):
+    """ Return every way to join the ports in pairs (105 for 8 ports). """
+
+    if not ports:
+        return [[]]
+    first = ports[0]
+    matchings = []
+    for other in ports[1:]:
+        rest = tuple(port for port in ports[1:] if port != other)
+        matchings += [[(first, other)] + pairs
+            for pairs in port_matchings(rest)]
+    return matchings
+
+
+def compile_matches(coord_list):
+    """ Turn matches.txt pairs (ports 1-8) into a Catalogue. A tile may be
+        listed by its first rotation only (4 pairs); the others are then
+        computed. """
+
+    perms = bytearray()
+    rotations = []
+    for coord in coord_list:
+        if isinstance(coord[0][0], int):
+            coord = all_rotations(coord)
+        distinct = []
+        seen = set()
+        for rotation, pairs in enumerate(coord):
+            perm = [0] * 8
+            for port_a, port_b in pairs:
+                perm[port_a - 1] = port_b - 1
+                perm[port_b - 1] = port_a - 1
+            perms += bytes(perm)
+            # Symmetric tiles repeat a connection pattern, keep the first
+            if tuple(perm) not in seen:
+                seen.add(tuple(perm))
+                distinct.append(rotation)
+        rotations.append(tuple(distinct))
+    return Catalogue(bytes(perms), tuple(rotations))
+
+
+def generate_catalogue(every_matching=False):
+    """ Return the Catalogue made from all port pairings with computed
+        rotations: a tile for each pairing no earlier tile turns into, or
+        with every_matching all 105 pairings as separate tiles. """
+
+    name = GENERATED_ALL if every_matching else GENERATED
+    if name not in _catalogues:
+        tiles = []
+        seen = set()
+        for pairs in port_matchings():
+            if not every_matching and tuple(pairs) in seen:
+                continue
+            rotations = all_rotations(pairs)
+            seen.update(tuple(rotation) for rotation in rotations)
+            tiles.append(rotations)
+        _catalogues[name] = compile_matches(tiles)
+    return _catalogues[name]
+
+
+def load_tile_set(name='matches.txt'):
+    """ Return the Catalogue of a tile set: GENERATED, GENERATED_ALL or the
+        path of a matches file. """
+
+    if name in (GENERATED, GENERATED_ALL):
+        return generate_catalogue(name == GENERATED_ALL)
+    return load_catalogue(name)
+
+
+def load_catalogue(path='matches.txt'):
+    """ Return the compiled catalogue for a matches file. The result is kept
+        in '<path>.cache', keyed by the file's hash, so the text is only
+        parsed again after it changes. """
+
+    if path in _catalogues:
+        return _catalogues[path]
+
+    with open(path, 'rb') as file:
+        digest = hashlib.sha1(file.read()).hexdigest()
+
+    cache_path = path + '.cache'
+    catalogue = None
+    try:
+        with open(cache_path, 'rb') as file:
+            cached_digest, perms, rotations = pickle.load(file)
+        if cached_digest == digest:
+            catalogue = Catalogue(perms, rotations)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    if catalogue is None:
+        catalogue = compile_matches(load_matches(path))
+        # Write next to the file and swap it in, a read-only checkout just
+        # compiles every time
+        try:
+            temp_path = cache_path + '.tmp'
+            with open(temp_path, 'wb') as file:
+                pickle.dump((digest, catalogue.perms, catalogue.rotations), file)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+
+    _catalogues[path] = catalogue
+    return catalogue
@@ -0,0 +1,274 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from analysis import SHARED_TABLE, evaluate, rewards
+from opening_book import load_book
+from policies import RandomPolicy
+
+
+class Node:
+    """ One position in the search tree, reached by a move. Tile draws are
+        random, so a node stands for every position that move sequence can
+        lead to (open loop search). """
+
+    __slots__ = ('children', 'visits', 'value')
+
+    def __init__(self):
+        """ The Constructor for Node class. """
+
+        self.children = {}
+        self.visits = 0
+        # Total reward of the seat that played the move into this node
+        self.value = 0.0
+
+
+class MCTSPolicy(RandomPolicy):
+    """ Computer seat that picks moves by Monte Carlo Tree Search on a
+        headless copy of the engine, within a wall-clock time and/or an
+        iteration budget per move. The tree is kept between turns.
+
+        leaf_batch rollouts are played from every new leaf and backed up
+        together, which spends more of each iteration on rollouts. Leaf
+        evaluations go through a transposition table, so a position reached
+        again by another move order reuses its rollouts.
+
+        Start spots come from the opening book file when there is one. """
+
+    def __init__(self, rng=None, time_limit=1.0, iterations=None,
+            exploration=0.7, leaf_batch=1, table=SHARED_TABLE,
+            book='openings.book'):
+        """ The Constructor for MCTSPolicy class. """
+
+        super().__init__(rng)
+        self._book = load_book(book) if book is not None else None
+        self._time_limit = time_limit
+        self._iterations = iterations
+        self._exploration = exploration
+        self._leaf_batch = leaf_batch
+        self._table = table
+        self._root = None
+        self._root_moves = 0
+
+    def choose_start(self, engine, seat):
+        """ Return the book's best free spot, or a random one without a book
+            for the engine's board and tile set. """
+
+        if self._book is None or not self._book.covers(engine):
+            return super().choose_start(engine, seat)
+        return self._book.best_spot(engine, seat)
+
+    def choose_move(self, engine):
+        """ Search from the engine's position, return the most visited move. """
+
+        root = self.advance_root(engine)
+        self.search(engine, root)
+        return self.finish_move(engine, root, visit_counts(root))
+
+    def move_steps(self, engine, step_time):
+        """ Search like choose_move in steps of about step_time seconds,
+            keeping the tree in between; the budget only counts the time
+            spent searching. """
+
+        root = self.advance_root(engine)
+        yield from self.search_steps(engine, root, step_time)
+        return self.finish_move(engine, root, visit_counts(root))
+
+    def finish_move(self, engine, root, visits):
+        """ Return the legal move with the most visits and keep its subtree
+            for the next turn. """
+
+        move = max(engine.legal_moves(), key=lambda m: visits.get(m, -1))
+        self._root = root.children.get(move)
+        self._root_moves = len(engine.moves()) + 1
+        return move
+
+    def advance_root(self, engine):
+        """ Walk the kept tree down the moves played since the last search. """
+
+        played = engine.moves()
+        node = self._root
+        if node is not None and len(played) >= self._root_moves:
+            for move in played[self._root_moves:]:
+                node = node.children.get(move)
+                if node is None:
+                    break
+        else:
+            node = None
+        return node if node is not None else Node()
+
+    def search(self, engine, root):
+        """ Run iterations from the engine's position until the budget ends;
+            returns the number of iterations. """
+
+        steps = self.search_steps(engine, root, None)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as done:
+                return done.value
+
+    def search_steps(self, engine, root, step_time):
+        """ Run iterations until the budget ends, yielding after every
+            step_time seconds of searching (never when it is None). The
+            position must not change in between. Returns the number of
+            iterations. """
+
+        spent = 0.0
+        count = 0
+        began = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if self._iterations is not None and count >= self._iterations:
+                break
+            if self._time_limit is not None and \
+                    spent + now - began >= self._time_limit:
+                break
+            if step_time is not None and now - began >= step_time:
+                spent += now - began
+                yield
+                began = time.perf_counter()
+            self.iterate(engine, root)
+            count += 1
+            # With no budget at all, stop after a single iteration
+            if self._time_limit is None and self._iterations is None:
+                break
+        return count
+
+    def iterate(self, engine, root):
+        """ One select, expand, roll out and back up pass. """
+
+        state = engine.copy(random.Random(self._rng.getrandbits(64)))
+        node = root
+        path = []
+        last_out = []
+
+        # Selection and expansion; moves not legal in this draw are skipped
+        while not state.is_terminal():
+            moves = state.legal_moves()
+            seat = state.current_seat()
+            untried = [move for move in moves if move not in node.children]
+            if untried:
+                move = self._rng.choice(untried)
+                node.children[move] = Node()
+            else:
+                move = self.select(node, moves)
+            node = node.children[move]
+            path.append((node, seat))
+            last_out = state.apply_move(move)
+            if node.visits == 0:
+                break
+
+        # Evaluate the leaf by rollouts to the end of the game
+        if state.is_terminal():
+            reward = rewards(state, last_out)
+        else:
+            reward = evaluate(state, self._leaf_batch, self._table, self._rng)
+        reward = [value * self._leaf_batch for value in reward]
+
+        root.visits += self._leaf_batch
+        for node, seat in path:
+            node.visits += self._leaf_batch
+            node.value += reward[seat]
+
+    def select(self, node, moves):
+        """ Return the move with the best upper confidence bound. """
+
+        log_parent = math.log(node.visits + 1)
+        best = None
+        best_score = -1.0
+        for move in moves:
+            child = node.children[move]
+            score = child.value / child.visits + self._exploration * \
+                math.sqrt(log_parent / child.visits)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+
+def visit_counts(root):
+    """ Return {move: visits} for the children of a node. """
+
+    return {move: child.visits for move, child in root.children.items()}
+
+
+def merge_visits(root, futures):
+    """ Return the visit counts of a root plus those of finished worker
+        searches. """
+
+    visits = visit_counts(root)
+    for future in futures:
+        for move, count in future.result().items():
+            visits[move] = visits.get(move, 0) + count
+    return visits
+
+
+def search_root(engine, seed, time_limit, iterations, exploration, leaf_batch):
+    """ Worker side of root parallel search: grow a fresh tree from the
+        engine's position and return its root visit counts. """
+
+    policy = MCTSPolicy(random.Random(seed), time_limit, iterations,
+        exploration, leaf_batch)
+    root = Node()
+    policy.search(engine, root)
+    return visit_counts(root)
+
+
+class ParallelMCTSPolicy(MCTSPolicy):
+    """ MCTS with root parallelism: worker processes grow independent trees
+        from the same position while this process grows the kept one, and
+        the root visit counts are summed to pick the move. An iteration
+        budget is split between the trees, a time limit applies to each. """
+
+    def __init__(self, rng=None, time_limit=1.0, iterations=None,
+            exploration=0.7, leaf_batch=1, workers=None, book='openings.book'):
+        """ The Constructor for ParallelMCTSPolicy class. """
+
+        self._workers = workers or os.cpu_count() or 1
+        if iterations is not None:
+            iterations = -(-iterations // self._workers)
+        super().__init__(rng, time_limit, iterations, exploration, leaf_batch,
+            book=book)
+        self._pool = None
+
+    def choose_move(self, engine):
+        """ Search on every core, return the move with the most visits. """
+
+        if self._workers == 1:
+            return super().choose_move(engine)
+        futures = self.submit_searches(engine)
+        root = self.advance_root(engine)
+        self.search(engine, root)
+        return self.finish_move(engine, root, merge_visits(root, futures))
+
+    def move_steps(self, engine, step_time):
+        """ Search like choose_move in steps of about step_time seconds; the
+            workers search meanwhile and are waited for a step at a time. """
+
+        if self._workers == 1:
+            return (yield from super().move_steps(engine, step_time))
+        futures = self.submit_searches(engine)
+        root = self.advance_root(engine)
+        yield from self.search_steps(engine, root, step_time)
+        while wait(futures, step_time).not_done:
+            yield
+        return self.finish_move(engine, root, merge_visits(root, futures))
+
+    def submit_searches(self, engine):
+        """ Start a tree on every worker process; returns their futures. """
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._workers - 1)
+        return [self._pool.submit(search_root, engine,
+            self._rng.getrandbits(64), self._time_limit, self._iterations,
+            self._exploration, self._leaf_batch)
+            for _ in range(self._workers - 1)]
+
+    def close(self):
+        """ Stop the worker processes. """
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,184 @@
+import argparse
+import json
+import random
+import struct
+
+from engine import SIZE, Engine
+from helpers import load_catalogue, load_tile_set
+
+# Header: magic, format version, engine seed, player count, board size and
+# tile count. Then one byte per seat for its start spot (0-47 on 6x6), then
+# 2 bytes per move: (tile * 4 + rotation) * cells + cell
+_HEADER = struct.Struct('<4sBQBBB')
+_MAGIC = b'TSML'
+# Version 2: the engine draws from its pile by swap-remove, so a seed deals
+# differently than in version 1 logs. Version 3: board size and tile count
+# in the header, moves numbered to fit boards up to 12x12 (16 bits hold up
+# to 113 tiles there)
+_VERSION = 3
+_MOVE = struct.Struct('<H')
+
+
+def encode_move(move, cells=SIZE * SIZE):
+    """ Return the 16 bit code of a (tile, rotation, cell) move. """
+
+    tile, rotation, cell = move
+    return (tile * 4 + rotation) * cells + cell
+
+
+def decode_move(code, cells=SIZE * SIZE):
+    """ Return the (tile, rotation, cell) move of a 16 bit code. """
+
+    placement, cell = divmod(code, cells)
+    return placement // 4, placement % 4, cell
+
+
+class MoveLog:
+    """ Everything needed to play a game again: the seed of the engine's
+        random number generator (which decides every deal), the player
+        count, the board size, the tile count (the tile set itself is given
+        to replay), the start spots in seat order and the moves. """
+
+    def __init__(self, seed, players, starts=(), moves=(), size=SIZE,
+            tiles=None):
+        """ The Constructor for MoveLog class. """
+
+        self.seed = seed
+        self.players = players
+        self.starts = list(starts)
+        self.moves = list(moves)
+        self.size = size
+        self.tiles = tiles if tiles is not None else load_catalogue().count
+
+    @classmethod
+    def from_engine(cls, seed, engine):
+        """ Return the log of an engine made with random.Random(seed). """
+
+        starts = [engine.start_spot(seat)
+            for seat in range(engine.num_players())] \
+            if not engine.in_setup() else []
+        return cls(seed, engine.num_players(), starts, engine.moves(),
+            engine.size(), engine.catalogue().count)
+
+    def header(self):
+        """ Return the bytes before the moves. """
+
+        return _HEADER.pack(_MAGIC, _VERSION, self.seed, self.players,
+            self.size, self.tiles) + bytes(self.starts)
+
+    def encode(self):
+        """ Return the whole log as bytes. """
+
+        cells = self.size * self.size
+        return self.header() + b''.join(_MOVE.pack(encode_move(move, cells))
+            for move in self.moves)
+
+    @classmethod
+    def decode(cls, data):
+        """ Return the log held in bytes made by encode or a LogWriter. A
+            log cut short (a crash while writing) keeps its whole moves. """
+
+        if len(data) < _HEADER.size:
+            raise ValueError("not a move log")
+        magic, version, seed, players, size, tiles = \
+            _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not a move log")
+        start = _HEADER.size
+        starts = list(data[start:start + players])
+        body = data[start + players:]
+        body = body[:len(body) - len(body) % _MOVE.size]
+        moves = [decode_move(code, size * size)
+            for (code,) in _MOVE.iter_unpack(body)]
+        return cls(seed, players, starts, moves, size, tiles)
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.decode(file.read())
+
+    def new_engine(self, catalogue=None):
+        """ Return the engine the game began with, markers not yet placed. """
+
+        catalogue = catalogue if catalogue is not None else load_catalogue()
+        if catalogue.count != self.tiles:
+            raise ValueError("log is for a set of " + str(self.tiles) +
+                " tiles")
+        return Engine(self.players, catalogue, random.Random(self.seed),
+            self.size)
+
+    def replay(self, catalogue=None):
+        """ Play the logged game headlessly and return the engine after the
+            last logged move. Raises ValueError on a move that is not legal
+            there (a log from another tile set or engine version). """
+
+        engine = self.new_engine(catalogue)
+        for seat, index in enumerate(self.starts):
+            engine.place_marker(seat, index)
+        for move in self.moves:
+            if not engine.is_legal(move):
+                raise ValueError("illegal move in log: " + str(move))
+            engine.apply_move(move)
+        return engine
+
+
+class LogWriter:
+    """ Appends a game's log to a file as it is played, so the file always
+        holds the game up to the last move. """
+
+    def __init__(self, path, seed, players, size=SIZE, tiles=None):
+        """ The Constructor for LogWriter class. """
+
+        self._file = open(path, 'wb')
+        self._cells = size * size
+        self._file.write(
+            MoveLog(seed, players, size=size, tiles=tiles).header())
+        self._file.flush()
+
+    def write_starts(self, starts):
+        """ Write the start spots, once every seat has placed its marker. """
+
+        self._file.write(bytes(starts))
+        self._file.flush()
+
+    def write_move(self, move):
+        self._file.write(_MOVE.pack(encode_move(move, self._cells)))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main(argv=None):
+    """ Command line entry point: replay move logs, print the outcomes. """
+
+    parser = argparse.ArgumentParser(
+        description="Replay Tsuro move logs headlessly.")
+    parser.add_argument('logs', nargs='+')
+    parser.add_argument('--tiles', default='matches.txt',
+        help="tile set the games used: a matches file, 'generated' or "
+        "'generated-all'")
+    args = parser.parse_args(argv)
+
+    for path in args.logs:
+        log = MoveLog.load(path)
+        engine = log.replay(load_tile_set(args.tiles))
+        print(json.dumps({
+            'log': path,
+            'seed': log.seed,
+            'players': log.players,
+            'size': log.size,
+            'moves': len(log.moves),
+            'finished': engine.is_terminal(),
+            'winner': engine.winner(),
+            'still_in': [seat for seat in range(log.players)
+                if engine.still_in(seat)],
+        }, separators=(',', ':')))
+
+
+if __name__ == "__main__":
+    main()
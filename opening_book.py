@@ -0,0 +1,269 @@
+import argparse
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from analysis import rewards
+from engine import BORDER, Engine
+from helpers import load_catalogue
+from policies import POLICIES, RandomPolicy, make_policy
+from symmetry import MATRICES, symmetry_for, transform_spot
+
+# Header: magic, version, lowest and highest player count, spots, tiles and
+# the SHA-1 digest of the tile set
+_HEADER = struct.Struct('<4sIIIII20s4x')
+_MAGIC = b'TSOB'
+# Version 3: the sections of version 2 books overlapped
+_VERSION = 3
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
+SPOTS = len(BORDER)
+# Pseudo games that pull sparse counts toward the 1 / players average
+_PRIOR = 2.0
+
+
+class _Layout:
+    """ Offsets of the (reward total, games) pairs in a book of float32s:
+        spot by player count, then spot and one opponent spot, then spot and
+        one tile of the starting hand. """
+
+    def __init__(self, tiles):
+        """ The Constructor for _Layout class. """
+
+        rows = (MAX_PLAYERS - MIN_PLAYERS + 1) * SPOTS
+        self.tiles = tiles
+        self.pairs = rows * 2
+        self.hands = self.pairs + rows * SPOTS * 2
+        self.size = self.hands + rows * tiles * 2
+
+    def row(self, players, spot):
+        return (players - MIN_PLAYERS) * SPOTS + spot
+
+    def base(self, row):
+        return row * 2
+
+    def pair(self, row, opponent):
+        return self.pairs + (row * SPOTS + opponent) * 2
+
+    def hand(self, row, tile):
+        return self.hands + (row * self.tiles + tile) * 2
+
+
+class BookBuilder:
+    """ Reward totals and game counts gathered from simulated openings. Each
+        record is also added under the 7 other board symmetries. """
+
+    def __init__(self, catalogue):
+        """ The Constructor for BookBuilder class. """
+
+        self._symmetry = symmetry_for(catalogue)
+        self._digest = catalogue.digest
+        self._layout = _Layout(catalogue.count)
+        self._data = array('d', bytes(8 * self._layout.size))
+
+    def add(self, players, spot, hand, opponents, reward):
+        """ Count one seat's result: its start spot, starting hand tiles,
+            the other seats' spots and the reward it got (0 to 1). """
+
+        layout = self._layout
+        data = self._data
+        for g in range(len(MATRICES)):
+            if not self._symmetry.usable[g]:
+                continue
+            tiles = self._symmetry.hand[g]
+            row = layout.row(players, transform_spot(spot, g))
+            offsets = [layout.base(row)]
+            offsets += [layout.pair(row, transform_spot(opponent, g))
+                for opponent in opponents]
+            offsets += [layout.hand(row, tiles[tile]) for tile in hand]
+            for offset in offsets:
+                data[offset] += reward
+                data[offset + 1] += 1
+
+    def merge(self, other):
+        """ Add the counts of another builder. """
+
+        data = self._data
+        for index, value in enumerate(other._data):
+            data[index] += value
+
+    def save(self, path):
+        """ Write the book file. """
+
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, MIN_PLAYERS,
+                MAX_PLAYERS, SPOTS, self._layout.tiles,
+                bytes.fromhex(self._digest)))
+            array('f', self._data).tofile(file)
+
+
+class OpeningBook:
+    """ Start spot win estimates read from a memory-mapped book file.
+
+        A spot's reward rate for the player count is adjusted by the rate
+        seen with each occupied opponent spot and each tile in hand,
+        combining them as independent evidence in log odds. """
+
+    def __init__(self, path):
+        """ The Constructor for OpeningBook class. """
+
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, low, high, spots, tiles, digest = \
+            _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION or \
+            (low, high, spots) != (MIN_PLAYERS, MAX_PLAYERS, SPOTS):
+            raise ValueError("not a compatible opening book: " + path)
+        self._layout = _Layout(tiles)
+        self._digest = digest.hex()
+        self._data = memoryview(self._map)[_HEADER.size:].cast('f')
+        if len(self._data) != self._layout.size:
+            raise ValueError("truncated opening book: " + path)
+
+    def _rate(self, offset, average):
+        total, games = self._data[offset], self._data[offset + 1]
+        rate = (total + _PRIOR * average) / (games + _PRIOR)
+        return math.log(rate / (1.0 - rate))
+
+    def estimate(self, players, spot, hand=(), opponents=()):
+        """ Return the expected reward (0 to 1) of starting on a spot. """
+
+        layout = self._layout
+        average = 1.0 / players
+        row = layout.row(players, spot)
+        base = self._rate(layout.base(row), average)
+        odds = base
+        for opponent in opponents:
+            odds += self._rate(layout.pair(row, opponent), average) - base
+        for tile in hand:
+            odds += self._rate(layout.hand(row, tile), average) - base
+        return 1.0 / (1.0 + math.exp(-odds))
+
+    def covers(self, engine):
+        """ Return True if the book was built for the engine's board size
+            and tile set; another set of the same size numbers its tiles
+            differently. """
+
+        return engine.spots() == SPOTS and \
+            engine.catalogue().digest == self._digest
+
+    def best_spot(self, engine, seat):
+        """ Return the free spot with the best estimate for a seat. """
+
+        players = engine.num_players()
+        hand = engine.hand(seat)
+        points = [engine.marker(other) for other in range(players)
+            if other != seat]
+        opponents = [index for index in range(SPOTS) if BORDER[index] in points]
+        free = [index for index in range(SPOTS) if engine.start_spot_free(index)]
+        return max(free,
+            key=lambda index: self.estimate(players, index, hand, opponents))
+
+    def close(self):
+        self._data.release()
+        self._map.close()
+
+
+# Books already opened, by path; None when the file is missing
+_books = {}
+
+
+def load_book(path='openings.book'):
+    """ Return the shared OpeningBook for a path, or None if there is none. """
+
+    if path not in _books:
+        _books[path] = OpeningBook(path) if os.path.exists(path) else None
+    return _books[path]
+
+
+def play_openings(players, policy, seed, start, count):
+    """ Play games start..start+count-1 from random start spots and return
+        a BookBuilder with every seat's result. """
+
+    catalogue = load_catalogue()
+    builder = BookBuilder(catalogue)
+    for game in range(start, start + count):
+        rng = random.Random(str(seed) + '-' + str(players) + '-' + str(game))
+        engine = Engine(players, catalogue, random.Random(rng.getrandbits(64)))
+        starter = RandomPolicy(rng)
+        seats = [make_policy(policy, random.Random(rng.getrandbits(64)))
+            for _ in range(players)]
+
+        spots = []
+        for seat in range(players):
+            spots.append(starter.choose_start(engine, seat))
+            engine.place_marker(seat, spots[seat])
+        hands = [engine.hand(seat) for seat in range(players)]
+
+        last_out = []
+        while not engine.is_terminal():
+            move = seats[engine.current_seat()].choose_move(engine)
+            last_out = engine.apply_move(move)
+
+        for seat, reward in enumerate(rewards(engine, last_out)):
+            builder.add(players, spots[seat], hands[seat],
+                spots[:seat] + spots[seat + 1:], reward)
+    return builder
+
+
+def build_book(games, player_counts, policy='safe', workers=None, seed=0,
+        chunk=200):
+    """ Simulate games for each player count on a process pool and return
+        the merged BookBuilder. """
+
+    workers = workers or os.cpu_count() or 1
+    tasks = iter([(players, start) for players in player_counts
+        for start in range(0, games, chunk)])
+    builder = BookBuilder(load_catalogue())
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit(task):
+            players, start = task
+            return pool.submit(play_openings, players, policy, seed, start,
+                min(chunk, games - start))
+
+        pending = {submit(task) for task in islice(tasks, workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for task in islice(tasks, 1):
+                    pending.add(submit(task))
+                builder.merge(future.result())
+    return builder
+
+
+def main(argv=None):
+    """ Command line entry point, writes the opening book file. """
+
+    parser = argparse.ArgumentParser(
+        description="Build the start spot opening book by simulation.")
+    parser.add_argument('-n', '--games', type=int, default=20000,
+        help="games per player count")
+    parser.add_argument('-p', '--players', type=int, action='append',
+        default=[], help="player count to cover (repeat; default all)")
+    parser.add_argument('--policy', default='safe', choices=sorted(POLICIES),
+        help="policy that plays the simulated games")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='openings.book')
+    args = parser.parse_args(argv)
+
+    player_counts = args.players or list(range(MIN_PLAYERS, MAX_PLAYERS + 1))
+    if any(not MIN_PLAYERS <= players <= MAX_PLAYERS
+            for players in player_counts):
+        parser.error("players must be between 2 and 8")
+
+    build_book(args.games, player_counts, args.policy, args.workers,
+        args.seed).save(args.output)
+    print("wrote " + args.output, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,34 +10,22 @@ class Player():
         self._win = win
         self._game = game
         self._current_loc = ()
-        self._location_history = []
         self._still_playing = True
 
         self._player_id = str(number + 1)
 
-        # Prepare the possible starting locations for each players:
-        initial_side_1 = (
-            133, 166, 233, 266, 333, 366, 433, 466, 533, 566, 633, 666)
-        initial_side_2 = initial_side_1[::-1]
-        self._initial_loc = []
-        for x1 in initial_side_1:
-            self._initial_loc.append((x1, 100))
-        for y1 in initial_side_1:
-            self._initial_loc.append((700, y1))
-        for x2 in initial_side_2:
-            self._initial_loc.append((x2, 700))
-        for y2 in initial_side_2:
-            self._initial_loc.append((100, y2))
+        # The starting locations for each player, the engine's border spots:
+        self._initial_loc = game.start_locations()
 
         # Create the graphic part of the markers:
         # All player pieces use the requested theme color
         marker_color = '#9bc3ab'
         panel_color = '#efe2c2'  # parchment panels
 
-        self._marker = Circle(self._win, 12, (133, 100))
+        self._marker = Circle(self._win, 12, self._initial_loc[0])
         self._marker.set_fill_color(marker_color)
         self._marker.set_depth(6 + 2 * number)
-        self._text = Text(self._win, self._player_id, 12, (133, 100))
+        self._text = Text(self._win, self._player_id, 12, self._initial_loc[0])
         self._text.set_depth(5 + 2 * number)
         self._piece = [self._marker, self._text]
         for element in self._piece:
@@ -74,7 +62,8 @@ class Player():
             " board to place it there."
         self._in_game_msg2 = Text(self._win, in_game_txt2, 10, (1100, -466))
         self._in_game_msg2.set_depth(39)
-        in_game_txt3 = "RIGHT CLICK the tile to rotate."
+        in_game_txt3 = "RIGHT CLICK the tile to rotate. " + \
+            "CTRL+Z undoes a placement, CTRL+Y redoes it."
         self._in_game_msg3 = Text(self._win, in_game_txt3, 10, (1100, -500))
         self._in_game_msg3.set_depth(39)
 
@@ -102,11 +91,16 @@ class Player():
         """ Left click to move the corresponding marker to one next location,
             and right click to set the piece and remove the click box. """
 
+        # The computer or another client sets this marker
+        if self._game.is_computer(self._player_id) or \
+            self._game.is_remote(self._player_id):
+            return
+
         button = event.get_button()
         if button == "Left Mouse Button":
             # If the move is legal, hide the warning and move the piece
             self._game.hide_warning_overlap()
-            if self._click_counter == 47:
+            if self._click_counter == len(self._initial_loc) - 1:
                 self._click_counter = 0
                 for element in self._piece:
                     element.move_to(self._initial_loc[self._click_counter])
@@ -117,35 +111,42 @@ class Player():
 
         if button == "Right Mouse Button":
             # If the move is ok, place the marker and move on to the next player
-            if self._game.no_overlap(self._initial_loc[self._click_counter]):
-                self.update_location(self._initial_loc[self._click_counter])
-                for element in self._click_box:
-                    element.move_to((-1000, -1000))
-                self._game.hide_hand(self._player_id)
-
-                # If this is the last player to finish set up, then run game
-                if self._game.last_on_the_list(self._player_id):
-                    self._game.remove_initial_view()
-                    self._game.run()
+            if self._game.no_overlap(self._click_counter):
+                self.set_start(self._click_counter)
             else:
                 self._game.show_warning_overlap()
 
+    def set_start(self, index):
+        """ Set the marker down on a border spot (0-47 on 6x6) and finish this
+            player's setup. """
+
+        self._click_counter = index
+        self.move_player(self._initial_loc[index])
+        self.update_location(self._initial_loc[index])
+        self._game.place_marker(self._player_id, index)
+        for element in self._click_box:
+            element.move_to((-1000, -1000))
+        self._game.hide_hand(self._player_id)
+        self._game.start_spot_set(self._player_id)
+
+    def unset_start(self):
+        """ Take the marker back up after an undo: show the click box and
+            the hand again so this player can choose a spot. """
+
+        for element in self._click_box:
+            element.move_to((400, 750))
+        self._game.display_hand(self._player_id, 15 + int(self._player_id))
+
     def update_location(self, coord):
-        """ Update the current location, and also adding it to history. """
+        """ Update the current location shown for the marker. """
 
         self._current_loc = coord
-        self._location_history.append(coord)
 
     def return_current_loc(self):
         """ Return the current location. """
 
         return self._current_loc
 
-    def hist(self):
-        """ Return the marker movement history. """
-
-        return self._location_history
-
     def move_player(self, location):
         """ Move the player marker to given location. """
 
@@ -158,10 +159,10 @@ class Player():
         self.move_player((-100, -100))
         self._still_playing = False
 
-    def return_border(self):
-        """ Return the coordinate for the borders. """
+    def rejoin(self):
+        """ An undo brought this player back into the game. """
 
-        return self._initial_loc
+        self._still_playing = True
 
     def return_id(self):
         """ Return player id string. """
@@ -0,0 +1,73 @@
+import random
+
+
+class RandomPolicy:
+    """ Computer seat that starts on a random free spot and plays a random
+        legal move. """
+
+    def __init__(self, rng=None):
+        """ The Constructor for RandomPolicy class. """
+
+        self._rng = rng if rng is not None else random.Random()
+
+    def choose_start(self, engine, seat):
+        """ Return the border spot (0-47 on 6x6) to start on. """
+
+        free = [index for index in range(engine.spots())
+            if engine.start_spot_free(index)]
+        return self._rng.choice(free)
+
+    def choose_move(self, engine):
+        """ Return the (tile, rotation, cell) to play for the current seat. """
+
+        return self._rng.choice(engine.legal_moves())
+
+    def move_steps(self, engine, step_time):
+        """ Generator for programs that must not stop for long (the window):
+            each step takes about step_time seconds and the move is its
+            return value. Quick policies choose in one step. """
+
+        return self.choose_move(engine)
+        yield
+
+
+class SafePolicy(RandomPolicy):
+    """ Computer seat that plays a random move which keeps its marker on the
+        board, and only walks off when every move does. """
+
+    def choose_move(self, engine):
+        """ Return the (tile, rotation, cell) to play for the current seat. """
+
+        moves = engine.safe_moves() or engine.legal_moves()
+        return self._rng.choice(moves)
+
+
+def _mcts_policy(rng=None, **options):
+    """ Make an MCTSPolicy; imported here since mcts builds on this module. """
+
+    from mcts import MCTSPolicy
+    return MCTSPolicy(rng, **options)
+
+
+def _parallel_mcts_policy(rng=None, **options):
+    """ Make a ParallelMCTSPolicy that searches on every core. """
+
+    from mcts import ParallelMCTSPolicy
+    return ParallelMCTSPolicy(rng, **options)
+
+
+# Policies that can fill a seat, by the name used on the command line
+POLICIES = {
+    'random': RandomPolicy,
+    'safe': SafePolicy,
+    'mcts': _mcts_policy,
+    'mcts-parallel': _parallel_mcts_policy,
+}
+
+
+def make_policy(name, rng=None, **options):
+    """ Make a policy object from its name, options go to its constructor. """
+
+    if name not in POLICIES:
+        raise ValueError("unknown policy: " + name)
+    return POLICIES[name](rng, **options)
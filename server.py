@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import random
+
+from engine import MAX_SIZE, SIZE, Engine
+from helpers import load_tile_set
+from movelog import decode_move, encode_move
+
+# Protocol: one JSON object per line over TCP, each with an "op".
+#   client -> server
+#     {"op":"join","table":name,"players":n}   sit at a table, made for n
+#                                               players if it is new
+#     {"op":"start","spot":index}               place the marker (setup)
+#     {"op":"move","move":code}                 play movelog.encode_move(move)
+#   server -> client
+#     {"op":"joined","table":name,"seat":s,"players":n,"size":cells,
+#      "tiles":digest,"starts":[index...],"moves":[code...],"hand":[tile...]}
+#                                               the seat, the table's game
+#                                               (tile set by its digest), the
+#                                               spots and moves so far and
+#                                               the seat's hand
+#     {"op":"start","seat":s,"spot":index,"hand":[tile...]}
+#                                               another seat's start spot
+#     {"op":"move","seat":s,"move":code,"out":[seat...],"dragon":holder,
+#      "hand":[tile...]}                        another seat's move, the seats
+#                                               it put out and the dragon
+#                                               holder after it (-1 is none)
+#     {"op":"hand","hand":[tile...]}            the reply to a seat's own
+#                                               start spot or move
+#     {"op":"seat","seat":s,"present":bool}     a seat was taken or left
+#     {"op":"error","reason":text}              a message was refused
+# The seed and the pile stay on the server: a seat is only told its own
+# hand, with every message that could change it.
+PORT = 8765
+BACKLOG = 1024
+
+
+def encode_message(message):
+    """ Return a protocol message as one line of bytes. """
+
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def decode_message(line):
+    """ Return the message held in a line; raises ValueError if it is not
+        a JSON object with an "op". """
+
+    message = json.loads(line)
+    if not isinstance(message, dict) or 'op' not in message:
+        raise ValueError("not a message")
+    return message
+
+
+class Table:
+    """ One game on the server: the authoritative engine and the stream
+        writer of each seat's client (None while the seat is free). """
+
+    def __init__(self, name, players, catalogue, size, seed):
+        """ The Constructor for Table class. """
+
+        self.name = name
+        self.seed = seed
+        self.engine = Engine(players, catalogue, random.Random(seed), size)
+        self.writers = [None] * players
+
+    def seated(self):
+        """ Return (seat, writer) for every client still connected; one
+            that has hung up keeps its seat until its handler sees it. """
+
+        return [(seat, writer) for seat, writer in enumerate(self.writers)
+            if writer is not None and not writer.is_closing()]
+
+    def free_seat(self):
+        """ Return the first seat without a client, or -1. """
+
+        return self.writers.index(None) if None in self.writers else -1
+
+    def empty(self):
+        return self.writers.count(None) == len(self.writers)
+
+    def welcome(self, seat):
+        """ Return the "joined" message of a client given a seat. """
+
+        engine = self.engine
+        placed = engine.setup_seat() if engine.in_setup() \
+            else engine.num_players()
+        cells = engine.geometry().cells
+        return {'op': 'joined', 'table': self.name, 'seat': seat,
+            'players': engine.num_players(), 'size': engine.size(),
+            'tiles': engine.catalogue().digest,
+            'starts': [engine.start_spot(before) for before in range(placed)],
+            'moves': [encode_move(move, cells) for move in engine.moves()],
+            'hand': engine.hand(seat)}
+
+    def play(self, seat, message):
+        """ Play a seat's "start" or "move" message on the engine and return
+            what the other seats may know of it. Raises ValueError when the
+            seat may not play it. """
+
+        # The engine refuses what its rules do not allow; only the types and
+        # whose turn it is are checked here
+        engine = self.engine
+        if message['op'] == 'start':
+            spot = message['spot']
+            if not isinstance(spot, int):
+                raise ValueError("start spot not free: " + repr(spot))
+            engine.place_marker(seat, spot)
+            return {'op': 'start', 'seat': seat, 'spot': spot}
+        if message['op'] == 'move':
+            code = message['move']
+            if engine.current_seat() != seat:
+                raise ValueError("not your turn")
+            if not isinstance(code, int) or code < 0:
+                raise ValueError("illegal move: " + repr(code))
+            out = engine.apply_move(decode_move(code, engine.geometry().cells))
+            return {'op': 'move', 'seat': seat, 'move': code, 'out': out,
+                'dragon': engine.dragon_holder()}
+        raise ValueError("unknown op: " + repr(message['op']))
+
+    def broadcast(self, message, skip=-1):
+        """ Send a message to every seated client but one seat. """
+
+        line = encode_message(message)
+        for seat, writer in self.seated():
+            if seat != skip:
+                writer.write(line)
+
+    def deal_out(self, message, mover):
+        """ Send a played message to the other seated clients, each with its
+            own hand, and the mover its hand alone. """
+
+        for seat, writer in self.seated():
+            hand = self.engine.hand(seat)
+            reply = {'op': 'hand', 'hand': hand} if seat == mover \
+                else dict(message, hand=hand)
+            writer.write(encode_message(reply))
+
+
+class TableServer:
+    """ Hosts any number of tables in one asyncio loop. A table is made by
+        the first join naming it and is dropped once its game is over or
+        every seat has left; a seat left during a game goes to the next
+        client joining that table, which gets the game so far. """
+
+    def __init__(self, catalogue=None, size=SIZE, seed=None):
+        """ The Constructor for TableServer class. Table seeds come from
+            random.Random(seed). """
+
+        self._catalogue = catalogue if catalogue is not None \
+            else load_tile_set()
+        self._size = size
+        self._rng = random.Random(seed)
+        self._tables = {}
+
+    def tables(self):
+        """ Return the number of tables in play. """
+
+        return len(self._tables)
+
+    def join(self, message, writer):
+        """ Seat a client at the table its join message names, making the
+            table if there is none. Returns (table, seat). """
+
+        name = str(message['table'])
+        table = self._tables.get(name)
+        if table is None:
+            players = message.get('players', 2)
+            if not isinstance(players, int) or not 2 <= players <= 8:
+                raise ValueError("players must be between 2 and 8")
+            table = Table(name, players, self._catalogue, self._size,
+                self._rng.getrandbits(64))
+            self._tables[name] = table
+        seat = table.free_seat()
+        if seat == -1:
+            raise ValueError("table is full: " + name)
+        table.writers[seat] = writer
+        table.broadcast({'op': 'seat', 'seat': seat, 'present': True}, seat)
+        return table, seat
+
+    def leave(self, table, seat):
+        """ Free a seat; the table is dropped once nobody is left. """
+
+        table.writers[seat] = None
+        table.broadcast({'op': 'seat', 'seat': seat, 'present': False})
+        if table.empty() and self._tables.get(table.name) is table:
+            del self._tables[table.name]
+
+    def play(self, table, seat, message):
+        """ Play a seat's message and pass it on to the other seats. """
+
+        table.deal_out(table.play(seat, message), seat)
+        # A finished game frees its name for a new table
+        if table.engine.is_terminal() and \
+                self._tables.get(table.name) is table:
+            del self._tables[table.name]
+
+    async def handle(self, reader, writer):
+        """ Serve one client connection until it closes. """
+
+        table = seat = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                    if message['op'] == 'join':
+                        if table is not None:
+                            raise ValueError("already at a table")
+                        table, seat = self.join(message, writer)
+                        writer.write(encode_message(table.welcome(seat)))
+                    elif table is None:
+                        raise ValueError("join a table first")
+                    else:
+                        self.play(table, seat, message)
+                except (KeyError, TypeError, ValueError) as error:
+                    reason = str(error) if isinstance(error, ValueError) \
+                        else "bad message"
+                    writer.write(
+                        encode_message({'op': 'error', 'reason': reason}))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if table is not None:
+                self.leave(table, seat)
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=PORT):
+        """ Start listening and return the asyncio Server (port 0 picks a
+            free port, see its sockets). """
+
+        # Hundreds of tables connect at once, past the default backlog of 100
+        return await asyncio.start_server(self.handle, host, port,
+            backlog=BACKLOG)
+
+    async def serve(self, host='127.0.0.1', port=PORT):
+        """ Serve until cancelled. """
+
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    """ Command line entry point: run a table server. """
+
+    parser = argparse.ArgumentParser(
+        description="Host Tsuro tables for network players.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--size', type=int, default=SIZE,
+        help="cells along each side of the board")
+    parser.add_argument('--tiles', default='matches.txt',
+        help="tile set: a matches file, 'generated' or 'generated-all'")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.size <= MAX_SIZE:
+        parser.error("size must be between 1 and " + str(MAX_SIZE))
+
+    server = TableServer(load_tile_set(args.tiles), args.size, args.seed)
+    print("serving on " + args.host + ":" + str(args.port))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from engine import MAX_SIZE, SIZE, Engine
+from helpers import load_tile_set
+from movelog import MoveLog
+from policies import POLICIES, make_policy
+
+
+def play_game(policies, seed, size=SIZE, tiles='matches.txt'):
+    """ Play one complete game without graphics, one policy name per seat,
+        on a size x size board with a tile set (see load_tile_set). Seats in
+        the result are numbered from 0. """
+
+    rng = random.Random(seed)
+    engine_seed = rng.getrandbits(64)
+    engine = Engine(len(policies), load_tile_set(tiles),
+        random.Random(engine_seed), size)
+    seats = [make_policy(name, random.Random(rng.getrandbits(64)))
+        for name in policies]
+
+    # Setup: every seat picks a start spot in turn
+    for seat, policy in enumerate(seats):
+        engine.place_marker(seat, policy.choose_start(engine, seat))
+
+    eliminations = []
+    while not engine.is_terminal():
+        turn = engine.turns()
+        move = seats[engine.current_seat()].choose_move(engine)
+        for seat in engine.apply_move(move):
+            eliminations.append([turn + 1, seat])
+
+    return {
+        'seed': seed,
+        'players': len(policies),
+        'winner': engine.winner(),
+        'turns': engine.turns(),
+        'eliminations': eliminations,
+        'dragon': [list(event) for event in engine.dragon_events()],
+        'log': MoveLog.from_engine(engine_seed, engine).encode().hex(),
+    }
+
+
+def play_batch(policies, seed, start, count, size=SIZE,
+        tiles='matches.txt'):
+    """ Play games start..start+count-1 of a run in one worker call. """
+
+    results = []
+    for game in range(start, start + count):
+        result = play_game(policies, str(seed) + '-' + str(game), size, tiles)
+        result['game'] = game
+        results.append(result)
+    return results
+
+
+def play_vectorized(policies, seed, start, count, size=SIZE,
+        tiles='matches.txt'):
+    """ Play games start..start+count-1 of a run in lockstep on the NumPy
+        batch engine. Only random seats are supported. The games of a call
+        share one random generator, so a result has no seed or move log to
+        replay it by, nor dragon events: it is keyed by 'game' only. """
+
+    from batch_engine import BatchEngine
+
+    if any(name != 'random' for name in policies):
+        raise ValueError("the vectorized engine only plays random seats")
+
+    batch = BatchEngine(count, len(policies), load_tile_set(tiles),
+        [seed, start], size)
+    batch.place_markers()
+    winners = batch.run()
+
+    results = []
+    for row in range(count):
+        eliminations = sorted(
+            [int(batch.eliminated_at[row, seat]), seat]
+            for seat in range(len(policies)) if batch.eliminated_at[row, seat])
+        results.append({
+            'players': len(policies),
+            'winner': None if winners[row] == -1 else int(winners[row]),
+            'turns': int(batch.turns[row]),
+            'eliminations': eliminations,
+            'game': start + row,
+        })
+    return results
+
+
+def simulate(games, policies, workers=None, seed=0, chunk=50,
+        vectorized=False, size=SIZE, tiles='matches.txt'):
+    """ Play many games on a process pool and yield each result as soon as
+        its batch finishes. Batches are submitted a few at a time so memory
+        stays flat however many games are asked for. """
+
+    workers = workers or os.cpu_count() or 1
+    starts = iter(range(0, games, chunk))
+    play = play_vectorized if vectorized else play_batch
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit(start):
+            return pool.submit(play, policies, seed, start,
+                min(chunk, games - start), size, tiles)
+
+        pending = {submit(start) for start in islice(starts, workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for start in islice(starts, 1):
+                    pending.add(submit(start))
+                yield from future.result()
+
+
+def main(argv=None):
+    """ Command line entry point, prints one JSON line per finished game. """
+
+    parser = argparse.ArgumentParser(
+        description="Play Tsuro games headlessly for balance testing.")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-p', '--players', type=int, default=2)
+    parser.add_argument('--policy', action='append', default=[],
+        choices=sorted(POLICIES),
+        help="policy for each seat in order; one value fills every seat")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=50,
+        help="games per worker task (use thousands with --vectorized)")
+    parser.add_argument('--vectorized', action='store_true',
+        help="play random seats on the NumPy batch engine")
+    parser.add_argument('--size', type=int, default=SIZE,
+        help="cells along each side of the board")
+    parser.add_argument('--tiles', default='matches.txt',
+        help="tile set: a matches file, 'generated' (the 35 distinct tiles) "
+        "or 'generated-all' (all 105 port pairings)")
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.players <= 8:
+        parser.error("players must be between 2 and 8")
+    if not 1 <= args.size <= MAX_SIZE:
+        parser.error("size must be between 1 and " + str(MAX_SIZE))
+    policies = args.policy or ['random']
+    if len(policies) == 1:
+        policies = policies * args.players
+    if len(policies) != args.players:
+        parser.error("give one --policy, or one per seat")
+    if args.vectorized and set(policies) != {'random'}:
+        parser.error("--vectorized only plays random seats")
+    if args.vectorized:
+        try:
+            import numpy
+        except ImportError:
+            parser.error("--vectorized needs NumPy: pip install numpy")
+
+    wins = [0] * args.players
+    ties = 0
+    for result in simulate(args.games, policies, args.workers, args.seed,
+            args.chunk, args.vectorized, args.size, args.tiles):
+        print(json.dumps(result, separators=(',', ':')), flush=True)
+        if result['winner'] is None:
+            ties += 1
+        else:
+            wins[result['winner']] += 1
+
+    print("wins per seat: " + " ".join(str(win) for win in wins) +
+        ", ties: " + str(ties), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
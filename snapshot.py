@@ -0,0 +1,264 @@
+import argparse
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from constants import WIN_WIDTH, WIN_HEIGHT, BOARD_LEN, IMG_DIR, PORT_SIXTHS
+from engine import MAX_SIZE, SIZE, Engine, board_geometry
+from helpers import load_tile_set
+from policies import POLICIES, make_policy
+
+# Same look as the window: markers, and tiles inset in their cells (by a
+# tenth of the cell)
+MARKER_COLOR = '#9bc3ab'
+MARKER_RADIUS = 12
+# The board with its border spots, in window pixels
+BOARD_BOX = (80, 80, 720, 720)
+# Colors of tiles drawn for sets without pictures
+TILE_COLOR = '#efe2c2'
+PATH_COLOR = '#5a4a3b'
+
+
+def cell_location(cell, size=SIZE):
+    """ Return the window pixel center of an engine cell. """
+
+    cell_len = BOARD_LEN // size
+    first = 400 - BOARD_LEN // 2 + cell_len // 2
+    return first + cell // size * cell_len, first + cell % size * cell_len
+
+
+def point_location(point, size=SIZE):
+    """ Return the window pixel location of an engine point. """
+
+    cell, port = board_geometry(size).point_cells[point][0]
+    x, y = cell_location(cell, size)
+    cell_len = BOARD_LEN // size
+    dx, dy = PORT_SIXTHS[port - 1]
+    return x + dx * cell_len // 6, y + dy * cell_len // 6
+
+
+def draw_tile(catalogue, tile, length=100):
+    """ Return a picture of a tile (first rotation): a curve for each pair
+        of connected ports, bending in from the edges. """
+
+    image = Image.new('RGB', (length, length), TILE_COLOR)
+    draw = ImageDraw.Draw(image)
+    center = length / 2
+
+    def port_point(port, depth):
+        # A port's spot on the edge, moved depth sixths in toward the middle
+        x, y = PORT_SIXTHS[port]
+        if abs(x) == 3:
+            x -= depth if x > 0 else -depth
+        else:
+            y -= depth if y > 0 else -depth
+        return center + x * length / 6, center + y * length / 6
+
+    perm = catalogue.perm(tile, 0)
+    for port in range(8):
+        other = perm[port]
+        if other < port:
+            continue
+        # Cubic Bezier from port to port through points 1.5 sixths inside
+        p0, p1 = port_point(port, 0), port_point(port, 1.5)
+        p2, p3 = port_point(other, 1.5), port_point(other, 0)
+        points = []
+        for step in range(25):
+            t = step / 24
+            a, b, c, d = (1 - t) ** 3, 3 * t * (1 - t) ** 2, \
+                3 * t * t * (1 - t), t ** 3
+            points.append((a * p0[0] + b * p1[0] + c * p2[0] + d * p3[0],
+                a * p0[1] + b * p1[1] + c * p2[1] + d * p3[1]))
+        draw.line(points, fill=PATH_COLOR, width=max(2, length // 25),
+            joint='curve')
+    draw.rectangle((0, 0, length - 1, length - 1), outline=PATH_COLOR)
+    return image
+
+
+def tile_image_dir(tile_set='matches.txt', catalogue=None):
+    """ Return the folder with a picture per tile of a tile set, named
+        '<tile>.jpg'. Only matches.txt has drawn pictures (IMG_DIR); other
+        sets are drawn once into a folder of IMG_DIR. """
+
+    if tile_set == 'matches.txt':
+        return IMG_DIR
+    catalogue = catalogue if catalogue is not None else load_tile_set(tile_set)
+    name = os.path.splitext(os.path.basename(tile_set))[0]
+    directory = os.path.join(IMG_DIR, 'tiles-' + name)
+    os.makedirs(directory, exist_ok=True)
+    for tile in range(catalogue.count):
+        path = os.path.join(directory, str(tile) + '.jpg')
+        if not os.path.exists(path):
+            draw_tile(catalogue, tile).save(path, quality=95)
+    return directory
+
+
+class BoardRenderer:
+    """ Draws engine positions with Pillow, laid out like the game window,
+        without a display. The background and board are composited once,
+        and tile images are loaded and turned once per rotation, so many
+        frames can be rendered with one renderer. """
+
+    def __init__(self, image_dir=IMG_DIR, box=BOARD_BOX, scale=1.0,
+            size=SIZE, tile_dir=None):
+        """ The Constructor for BoardRenderer class. Renders the window area
+            inside box (left, top, right, bottom), resized by scale, for
+            boards of size x size cells. Tile pictures come from tile_dir
+            (default: image_dir), see tile_image_dir. """
+
+        self._image_dir = image_dir
+        self._tile_dir = tile_dir if tile_dir is not None else image_dir
+        self._box = box
+        self._scale = scale
+        self._size = size
+        self._tile_len = BOARD_LEN // size * 9 // 10
+
+        background = Image.open(image_dir + '/bkg2.png').convert('RGB')
+        background = background.resize((WIN_WIDTH, WIN_HEIGHT))
+        board = Image.open(image_dir + '/board.jpg').convert('RGB')
+        board = board.resize((BOARD_LEN, BOARD_LEN))
+        background.paste(board, (400 - BOARD_LEN // 2, 400 - BOARD_LEN // 2))
+        self._base = background.crop(box)
+
+        self._tiles = {}
+        self._font = ImageFont.load_default()
+
+    def tile_image(self, tile, rotation):
+        """ Return a tile's image turned like the window shows it. """
+
+        if (tile, rotation) not in self._tiles:
+            if rotation == 0:
+                image = Image.open(self._tile_dir + '/' + str(tile) + '.jpg')
+                image = image.convert('RGB').resize(
+                    (self._tile_len, self._tile_len))
+            else:
+                # Rotations turn the tile a quarter counterclockwise each
+                image = self.tile_image(tile, 0).rotate(90 * rotation)
+            self._tiles[tile, rotation] = image
+        return self._tiles[tile, rotation]
+
+    def paste_tile(self, canvas, tile, rotation, cell):
+        """ Put one placed tile on a canvas made by this renderer. """
+
+        x, y = cell_location(cell, self._size)
+        half = self._tile_len // 2
+        canvas.paste(self.tile_image(tile, rotation),
+            (x - half - self._box[0], y - half - self._box[1]))
+
+    def tile_layer(self, engine):
+        """ Return the board with the engine's placed tiles, no markers. """
+
+        canvas = self._base.copy()
+        for cell in range(engine.geometry().cells):
+            tile, rotation = engine.cell(cell)
+            if tile != -1:
+                self.paste_tile(canvas, tile, rotation, cell)
+        return canvas
+
+    def finish(self, layer, engine):
+        """ Return a copy of a tile layer with the markers still in play,
+            resized by the renderer's scale. """
+
+        canvas = layer.copy()
+        draw = ImageDraw.Draw(canvas)
+        for seat in range(engine.num_players()):
+            if engine.marker(seat) == -1 or not engine.still_in(seat):
+                continue
+            x, y = point_location(engine.marker(seat), self._size)
+            x, y = x - self._box[0], y - self._box[1]
+            draw.ellipse((x - MARKER_RADIUS, y - MARKER_RADIUS,
+                x + MARKER_RADIUS, y + MARKER_RADIUS), fill=MARKER_COLOR,
+                outline='black', width=2)
+            draw.text((x, y), str(seat + 1), fill='black', font=self._font,
+                anchor='mm')
+        if self._scale != 1.0:
+            canvas = canvas.resize((round(canvas.width * self._scale),
+                round(canvas.height * self._scale)))
+        return canvas
+
+    def render(self, engine):
+        """ Return a Pillow image of the engine's position. """
+
+        return self.finish(self.tile_layer(engine), engine)
+
+    def save(self, engine, path, **params):
+        """ Render the position to a file, the format comes from the name
+            (.png, .webp, ...); params go to Pillow's save. """
+
+        self.render(engine).save(path, **params)
+
+    def replay(self, engine, moves):
+        """ Play moves on a copy of the engine and yield a frame before the
+            first move and after each one. Tiles are only ever added, so
+            each frame pastes one tile on the previous tile layer. """
+
+        state = engine.copy()
+        layer = self.tile_layer(state)
+        yield self.finish(layer, state)
+        for tile, rotation, cell in moves:
+            state.apply_move((tile, rotation, cell))
+            self.paste_tile(layer, tile, rotation, cell)
+            yield self.finish(layer, state)
+
+
+def filmstrip(frames, columns=8, gap=4):
+    """ Return one image with the frames laid out in rows. """
+
+    frames = list(frames)
+    width, height = frames[0].size
+    rows = -(-len(frames) // columns)
+    strip = Image.new('RGB', (columns * (width + gap) - gap,
+        rows * (height + gap) - gap), 'white')
+    for index, frame in enumerate(frames):
+        strip.paste(frame, (index % columns * (width + gap),
+            index // columns * (height + gap)))
+    return strip
+
+
+def main(argv=None):
+    """ Command line entry point: play a game headlessly and save its final
+        board, or a filmstrip of every move. """
+
+    parser = argparse.ArgumentParser(
+        description="Render Tsuro boards to image files without a display.")
+    parser.add_argument('-p', '--players', type=int, default=2)
+    parser.add_argument('--policy', default='safe', choices=sorted(POLICIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--size', type=int, default=SIZE,
+        help="cells along each side of the board")
+    parser.add_argument('--tiles', default='matches.txt',
+        help="tile set: a matches file, 'generated' or 'generated-all'")
+    parser.add_argument('--film', action='store_true',
+        help="save a frame for every move instead of the final board")
+    parser.add_argument('-o', '--output', default='board.png')
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.players <= 8:
+        parser.error("players must be between 2 and 8")
+    if not 1 <= args.size <= MAX_SIZE:
+        parser.error("size must be between 1 and " + str(MAX_SIZE))
+
+    catalogue = load_tile_set(args.tiles)
+    rng = random.Random(args.seed)
+    engine = Engine(args.players, catalogue,
+        random.Random(rng.getrandbits(64)), args.size)
+    seats = [make_policy(args.policy, random.Random(rng.getrandbits(64)))
+        for _ in range(args.players)]
+    for seat, policy in enumerate(seats):
+        engine.place_marker(seat, policy.choose_start(engine, seat))
+    start = engine.copy()
+    while not engine.is_terminal():
+        engine.apply_move(seats[engine.current_seat()].choose_move(engine))
+
+    renderer = BoardRenderer(scale=args.scale, size=args.size,
+        tile_dir=tile_image_dir(args.tiles, catalogue))
+    if args.film:
+        filmstrip(renderer.replay(start, engine.moves())).save(args.output)
+    else:
+        renderer.save(engine, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from engine import SIZE, board_geometry
+from zobrist import zobrist_tables
+
+# The 8 symmetries of the square as 2x2 matrices (a, b, c, d) acting on
+# (x, y) -> (a*x + b*y, c*x + d*y), with y pointing down like the screen:
+# identity, 3 quarter turns, then the 4 mirror images
+MATRICES = [
+    (1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0),
+    (-1, 0, 0, 1), (1, 0, 0, -1), (0, 1, 1, 0), (0, -1, -1, 0)]
+# INVERSE[g] undoes symmetry g
+INVERSE = [0, 3, 2, 1, 4, 5, 6, 7]
+
+# Port 1-8 positions around a cell center, in sixths of a cell
+_PORT_OFFSETS = [(-1, -3), (1, -3), (-3, -1), (3, -1), (-3, 1), (3, 1), \
+    (-1, 3), (1, 3)]
+
+
+def _apply(matrix, x, y):
+    a, b, c, d = matrix
+    return a * x + b * y, c * x + d * y
+
+
+def _build_maps(matrix, geometry):
+    """ Return (cell map, port map, slot map) of one symmetry. """
+
+    size = geometry.size
+    port_slot = geometry.port_slot
+
+    # Cells, in doubled coordinates around the board center
+    cell_map = [0] * geometry.cells
+    for col in range(size):
+        for row in range(size):
+            x, y = _apply(matrix, 2 * col - size + 1, 2 * row - size + 1)
+            cell_map[col * size + row] = \
+                (x + size - 1) // 2 * size + (y + size - 1) // 2
+
+    port_map = [_PORT_OFFSETS.index(_apply(matrix, x, y))
+        for x, y in _PORT_OFFSETS]
+
+    # Slots of every cell port, then the outer side of the border points
+    slot_map = [-1] * geometry.slots
+    for cell in range(geometry.cells):
+        for port in range(8):
+            slot_map[port_slot[cell * 8 + port]] = \
+                port_slot[cell_map[cell] * 8 + port_map[port]]
+    for slot in range(geometry.slots):
+        if slot_map[slot] == -1:
+            slot_map[slot] = slot_map[slot ^ 1] ^ 1
+    return cell_map, port_map, slot_map
+
+
+class BoardMaps:
+    """ Where cells, ports, slots and start spots go under each symmetry
+        on one board size. """
+
+    def __init__(self, size):
+        """ The Constructor for BoardMaps class. """
+
+        geometry = board_geometry(size)
+        self.cell, self.port, self.slot = zip(*[_build_maps(m, geometry)
+            for m in MATRICES])
+        # border[g][index] -> where start spot index goes under g
+        border_slots = geometry.border_slots
+        self.border = [[border_slots.index(slot_map[slot])
+            for slot in border_slots] for slot_map in self.slot]
+
+
+# Maps already built, by board size
+_maps = {}
+
+
+def board_maps(size=SIZE):
+    """ Return the shared BoardMaps of a board size. """
+
+    if size not in _maps:
+        _maps[size] = BoardMaps(size)
+    return _maps[size]
+
+
+# The maps of the standard 6x6 board
+CELL_MAPS = board_maps(SIZE).cell
+PORT_MAPS = board_maps(SIZE).port
+SLOT_MAPS = board_maps(SIZE).slot
+# BORDER_MAPS[g][index] -> where start spot index (0-47) goes under g
+BORDER_MAPS = board_maps(SIZE).border
+
+
+class Symmetry:
+    """ How the tiles of a catalogue change under the board symmetries.
+        Rotations that connect the same ports count as the same placement,
+        so symmetric tiles do not split an equivalence class. """
+
+    def __init__(self, catalogue, size=SIZE):
+        """ The Constructor for Symmetry class. """
+
+        self._catalogue = catalogue
+        self._geometry = board_geometry(size)
+        self._maps = board_maps(size)
+        count = catalogue.count
+
+        # Every distinct connection pattern -> tile * 4 + first rotation
+        patterns = {}
+        for tile in range(count):
+            for rotation in range(4):
+                patterns.setdefault(catalogue.perm(tile, rotation),
+                    tile * 4 + rotation)
+
+        # placed[g][tile * 4 + rotation] -> normalized tile * 4 + rotation
+        # hand[g][tile] -> tile; a mirror image missing from the tile set
+        # makes that symmetry unusable
+        self.placed = []
+        self.hand = []
+        self.usable = []
+        for port_map in PORT_MAPS:
+            placed = []
+            for tile in range(count):
+                for rotation in range(4):
+                    perm = catalogue.perm(tile, rotation)
+                    moved = [0] * 8
+                    for port in range(8):
+                        moved[port_map[port]] = port_map[perm[port]]
+                    placed.append(patterns.get(bytes(moved), -1))
+            self.placed.append(placed)
+            self.hand.append([placed[tile * 4] // 4 if placed[tile * 4] != -1
+                else -1 for tile in range(count)])
+            self.usable.append(-1 not in placed)
+
+    def position_key(self, engine, g):
+        """ Return the Zobrist key of the engine's position mapped by
+            symmetry g, with symmetric tile rotations normalized. """
+
+        geometry = self._geometry
+        zobrist = zobrist_tables(geometry.cells, geometry.slots,
+            self._catalogue.count)
+        tiles = self._catalogue.count
+        cell_map = self._maps.cell[g]
+        slot_map = self._maps.slot[g]
+        placed = self.placed[g]
+        hand = self.hand[g]
+
+        key = zobrist.turn[engine.current_seat()]
+        for cell in range(geometry.cells):
+            tile, rotation = engine.cell(cell)
+            if tile != -1:
+                moved = placed[tile * 4 + rotation]
+                key ^= zobrist.cell[cell_map[cell] * tiles * 4 + moved]
+        for seat in range(engine.num_players()):
+            slot = engine.marker_slot(seat)
+            if slot != -1:
+                key ^= zobrist.marker[seat * geometry.slots + slot_map[slot]]
+            for tile in engine.hand(seat):
+                key ^= zobrist.hand[seat * tiles + hand[tile]]
+        if engine.dragon_holder() != -1:
+            key ^= zobrist.dragon[engine.dragon_holder()]
+        return key
+
+    def canonical_key(self, engine):
+        """ Return (key, g): the smallest key over all usable symmetries and
+            the symmetry g that gives it. Equivalent positions share it. """
+
+        return min((self.position_key(engine, g), g)
+            for g in range(len(MATRICES)) if self.usable[g])
+
+    def transform_move(self, move, g):
+        """ Return a (tile, rotation, cell) move mapped by symmetry g. """
+
+        tile, rotation, cell = move
+        moved = self.placed[g][tile * 4 + rotation]
+        return moved // 4, moved % 4, self._maps.cell[g][cell]
+
+
+# Symmetry helpers already made, by catalogue digest and board size
+_symmetries = {}
+
+
+def symmetry_for(catalogue, size=SIZE):
+    """ Return the shared Symmetry of a catalogue on a board size. """
+
+    key = (catalogue.digest, size)
+    if key not in _symmetries:
+        _symmetries[key] = Symmetry(catalogue, size)
+    return _symmetries[key]
+
+
+def canonical_key(engine):
+    """ Return (key, g) of the engine's position, see Symmetry. """
+
+    symmetry = symmetry_for(engine.catalogue(), engine.size())
+    return symmetry.canonical_key(engine)
+
+
+def transform_spot(index, g, size=SIZE):
+    """ Return where start spot index (0-47 on 6x6) goes under symmetry g. """
+
+    return board_maps(size).border[g][index]
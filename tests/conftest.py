@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules sit at the repository root and read matches.txt from there
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    """ Run every test from the repository root. """
+
+    monkeypatch.chdir(ROOT)
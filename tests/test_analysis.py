@@ -0,0 +1,28 @@
+import random
+
+from analysis import evaluate
+from engine import Engine
+from helpers import load_catalogue, load_tile_set
+from symmetry import canonical_key
+from zobrist import TranspositionTable
+
+
+def test_table_keeps_games_apart():
+    """ Positions of two games with the same key do not share evaluations:
+        here the same deals from matches.txt and from the 'generated' set,
+        which has as many tiles. """
+
+    engines = []
+    for catalogue in (load_catalogue(), load_tile_set('generated')):
+        engine = Engine(2, catalogue, random.Random(0))
+        engine.place_marker(0, 0)
+        engine.place_marker(1, 20)
+        engines.append(engine)
+    assert canonical_key(engines[0])[0] == canonical_key(engines[1])[0]
+
+    table = TranspositionTable(bits=8)
+    first = evaluate(engines[0], 20, table, random.Random(1))
+    # The game finds its own entry again, the other game plays its rollouts
+    assert evaluate(engines[0], 20, table, random.Random(3)) == first
+    assert evaluate(engines[1], 20, table, random.Random(2)) == \
+        evaluate(engines[1], 20, None, random.Random(2))
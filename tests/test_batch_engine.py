@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from simulate import play_batch, play_vectorized
+
+GAMES = 4000
+
+
+def outcome_rates(results, players):
+    """ Return each seat's win rate, the tie rate and the mean turn count. """
+
+    wins = [0] * (players + 1)
+    for result in results:
+        winner = result['winner']
+        wins[players if winner is None else winner] += 1
+    turns = sum(result['turns'] for result in results) / len(results)
+    return [count / len(results) for count in wins], turns
+
+
+@pytest.mark.parametrize('players', [2, 4])
+def test_batch_engine_plays_like_engine(players):
+    """ Random seats win, tie and last as long on the batch engine as on
+        the scalar engine. """
+
+    policies = ['random'] * players
+    scalar, scalar_turns = outcome_rates(
+        play_batch(policies, 0, 0, GAMES), players)
+    batch, batch_turns = outcome_rates(
+        play_vectorized(policies, 0, 0, GAMES), players)
+    for scalar_rate, batch_rate in zip(scalar, batch):
+        assert abs(scalar_rate - batch_rate) < 0.04
+    assert abs(scalar_turns - batch_turns) < 0.05 * scalar_turns
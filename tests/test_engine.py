@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from engine import POINT_CELLS, Engine
+from helpers import load_matches
+
+# The pixel layout of the original Game: cell centers, port offsets and the
+# 48 border spots in engine order
+CENTERS = [(x, y) for x in range(150, 700, 100) for y in range(150, 700, 100)]
+SHIFTS = [(-17, -50), (16, -50), (-50, -17), (50, -17), (-50, 16), (50, 16),
+    (-17, 50), (16, 50)]
+_SIDE = (133, 166, 233, 266, 333, 366, 433, 466, 533, 566, 633, 666)
+BORDER = [(x, 100) for x in _SIDE] + [(700, y) for y in _SIDE] + \
+    [(x, 700) for x in _SIDE[::-1]] + [(100, y) for y in _SIDE[::-1]]
+
+
+def shifted(center, port):
+    return tuple(map(sum, zip(center, SHIFTS[port - 1])))
+
+
+class PixelBoard:
+    """ The pathfinding the engine replaced: two dictionaries from pixel
+        spot to linked pixel spot, and markers that follow them while the
+        next spot is not in their history. """
+
+    def __init__(self, starts):
+        """ The Constructor for PixelBoard class. """
+
+        self.dict1 = {}
+        self.dict2 = {}
+        self.hist = [[BORDER[index]] for index in starts]
+        self.alive = [True] * len(starts)
+
+    def place(self, pairs, center):
+        for port_a, port_b in pairs:
+            spot_a, spot_b = shifted(center, port_a), shifted(center, port_b)
+            for spot, other in ((spot_a, spot_b), (spot_b, spot_a)):
+                if spot in self.dict1:
+                    self.dict2[spot] = other
+                else:
+                    self.dict1[spot] = other
+        for seat, hist in enumerate(self.hist):
+            if self.alive[seat]:
+                self.follow(hist)
+                if hist[-1] in BORDER and len(hist) != 1:
+                    self.alive[seat] = False
+
+    def follow(self, hist):
+        while True:
+            steps = [links[hist[-1]] for links in (self.dict1, self.dict2)
+                if hist[-1] in links and links[hist[-1]] not in hist]
+            if len(steps) != 1:
+                return
+            hist.append(steps[0])
+
+
+def pixel(point):
+    cell, port = POINT_CELLS[point][0]
+    return shifted(CENTERS[cell], port)
+
+
+def test_engine_matches_pixel_dictionaries():
+    """ Random games move every marker to the same spot and eliminate the
+        same seats as the original pixel dictionaries. """
+
+    coords = load_matches()
+    for seed in range(500):
+        rng = random.Random(seed)
+        players = 2 + seed % 7
+        engine = Engine(players, rng=random.Random(seed))
+        starts = rng.sample(range(len(BORDER)), players)
+        for seat, index in enumerate(starts):
+            engine.place_marker(seat, index)
+        board = PixelBoard(starts)
+        while not engine.is_terminal():
+            tile, rotation, cell = move = rng.choice(engine.legal_moves())
+            engine.apply_move(move)
+            board.place(coords[tile][rotation], CENTERS[cell])
+            for seat in range(players):
+                assert engine.still_in(seat) == board.alive[seat], seed
+                assert pixel(engine.marker(seat)) == board.hist[seat][-1], seed
+
+
+def test_setup_rules():
+    """ Markers go down in seat order on free spots, and no tile is played
+        before every marker is placed or a marker moved after. """
+
+    engine = Engine(3, rng=random.Random(0))
+    for seat, index in [(1, 0), (0, -1), (0, 48)]:
+        with pytest.raises(ValueError):
+            engine.place_marker(seat, index)
+    engine.place_marker(0, 0)
+    with pytest.raises(ValueError):
+        engine.place_marker(1, 0)
+    assert engine.legal_moves() == []
+    move = (engine.hand(0)[0], 0, 0)
+    assert not engine.is_legal(move)
+    with pytest.raises(ValueError):
+        engine.apply_move(move)
+    engine.place_marker(1, 5)
+    engine.place_marker(2, 20)
+    assert not engine.in_setup() and engine.legal_moves()
+    for seat in (0, 2, -1):
+        with pytest.raises(ValueError):
+            engine.place_marker(seat, 30)
+
+
+def position(engine):
+    """ Return everything undo has to put back, the pile order and the
+        random number generator included. """
+
+    seats = range(engine.num_players())
+    return (engine._pile[:], engine._rng.getstate(), engine.key(),
+        [engine.hand(seat) for seat in seats],
+        [engine.marker(seat) for seat in seats],
+        [engine.still_in(seat) for seat in seats],
+        [engine.cell(cell) for cell in range(engine.geometry().cells)],
+        engine.dragon_holder(), engine.dragon_events(),
+        engine.current_seat(), engine.turns(), engine.moves())
+
+
+def test_undo_and_redo_restore_every_ply():
+    """ Undoing to the start passes back through every position played,
+        and redoing to the end reaches the same final position. """
+
+    for seed in range(100):
+        rng = random.Random(seed)
+        engine = Engine(2 + seed % 7, rng=random.Random(seed))
+        engine.keep_history()
+        positions = [position(engine)]
+        for seat in range(engine.num_players()):
+            free = [index for index in range(engine.spots())
+                if engine.start_spot_free(index)]
+            engine.place_marker(seat, rng.choice(free))
+            positions.append(position(engine))
+        while not engine.is_terminal():
+            engine.apply_move(rng.choice(engine.legal_moves()))
+            positions.append(position(engine))
+
+        for before in reversed(positions[:-1]):
+            assert engine.undo() is not None
+            assert position(engine) == before
+        assert engine.undo() is None
+
+        while engine.redo() is not None:
+            pass
+        assert position(engine) == positions[-1]
+        assert engine.key() == engine.compute_key()
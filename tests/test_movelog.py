@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from engine import Engine
+from helpers import load_catalogue, load_tile_set
+from movelog import MoveLog, decode_move, encode_move
+
+
+def play_game(seed, players, catalogue, size):
+    """ Return a finished random game and its seed. """
+
+    rng = random.Random(seed)
+    engine = Engine(players, catalogue, random.Random(seed), size)
+    for seat in range(players):
+        free = [index for index in range(engine.spots())
+            if engine.start_spot_free(index)]
+        engine.place_marker(seat, rng.choice(free))
+    while not engine.is_terminal():
+        engine.apply_move(rng.choice(engine.legal_moves()))
+    return engine
+
+
+@pytest.mark.parametrize('tiles, size, players', [
+    ('matches.txt', 6, 4), ('generated-all', 12, 8)])
+def test_log_round_trip(tiles, size, players):
+    """ A game encoded, decoded and replayed on a fresh engine ends with the
+        same moves, markers and key. """
+
+    catalogue = load_catalogue() if tiles == 'matches.txt' \
+        else load_tile_set(tiles)
+    for seed in range(20):
+        engine = play_game(seed, players, catalogue, size)
+        log = MoveLog.decode(MoveLog.from_engine(seed, engine).encode())
+        assert (log.seed, log.players, log.size, log.tiles) == \
+            (seed, players, size, catalogue.count)
+        replayed = log.replay(catalogue)
+        assert replayed.moves() == engine.moves()
+        assert [replayed.marker(seat) for seat in range(players)] == \
+            [engine.marker(seat) for seat in range(players)]
+        assert replayed.key() == engine.key()
+
+
+def test_largest_move_code():
+    """ The last tile of 'generated-all' in its last rotation on the last
+        cell of a 12x12 board still fits the 16 bit move code. """
+
+    cells = 12 * 12
+    move = (load_tile_set('generated-all').count - 1, 3, cells - 1)
+    code = encode_move(move, cells)
+    assert code < 1 << 16
+    assert decode_move(code, cells) == move
+
+
+def test_truncated_log_keeps_whole_moves():
+    """ A log cut inside a move decodes to the moves before it. """
+
+    engine = play_game(1, 3, load_catalogue(), 6)
+    data = MoveLog.from_engine(1, engine).encode()
+    log = MoveLog.decode(data[:-1])
+    assert log.moves == engine.moves()[:-1]
+    assert log.replay().moves() == engine.moves()[:-1]
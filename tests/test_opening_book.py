@@ -0,0 +1,46 @@
+from helpers import load_catalogue
+from opening_book import MAX_PLAYERS, MIN_PLAYERS, SPOTS, BookBuilder, \
+    _Layout
+from symmetry import MATRICES, transform_spot
+
+
+def test_layout_sections_do_not_overlap():
+    """ Every (players, spot) row owns its own base, pair and hand cells. """
+
+    layout = _Layout(35)
+    offsets = []
+    for players in range(MIN_PLAYERS, MAX_PLAYERS + 1):
+        for spot in range(SPOTS):
+            row = layout.row(players, spot)
+            offsets.append(layout.base(row))
+            offsets += [layout.pair(row, other) for other in range(SPOTS)]
+            offsets += [layout.hand(row, tile) for tile in range(35)]
+    assert sorted(offsets) == list(range(0, layout.size, 2))
+
+
+def test_add_only_touches_its_rows():
+    """ BookBuilder.add counts a record in the base, pair and hand cells of
+        its own row (and its symmetric rows) and nowhere else. """
+
+    catalogue = load_catalogue()
+    builder = BookBuilder(catalogue)
+    layout = builder._layout
+    symmetry = builder._symmetry
+    players, spot, hand, opponents = 8, 5, [0, 7, 20], [11, 30, 47]
+    builder.add(players, spot, hand, opponents, 1.0)
+
+    expected = set()
+    for g in range(len(MATRICES)):
+        if not symmetry.usable[g]:
+            continue
+        row = layout.row(players, transform_spot(spot, g))
+        expected.add(layout.base(row))
+        expected.update(layout.pair(row, transform_spot(opponent, g))
+            for opponent in opponents)
+        expected.update(layout.hand(row, symmetry.hand[g][tile])
+            for tile in hand)
+    changed = {index for index, value in enumerate(builder._data)
+        if value and index % 2 == 0}
+    assert changed == expected
+    for offset in expected:
+        assert builder._data[offset + 1] == builder._data[offset]
@@ -0,0 +1,108 @@
+import asyncio
+import random
+
+import pytest
+
+from client import TableClient, play_seat
+from helpers import load_catalogue
+from policies import make_policy
+from server import TableServer
+
+TABLES = 20
+
+
+class RecordingServer(TableServer):
+    """ A TableServer that keeps every table it made, finished or not. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.made = {}
+
+    def join(self, message, writer):
+        table, seat = super().join(message, writer)
+        self.made[table.name] = table
+        return table, seat
+
+
+def public_view(engine):
+    """ Return what every seat at a table may know of the game. """
+
+    seats = range(engine.num_players())
+    return (engine.moves(), [engine.marker(seat) for seat in seats],
+        [engine.still_in(seat) for seat in seats],
+        [len(engine.hand(seat)) for seat in seats], engine.pile_size(),
+        engine.dragon_events(), engine.current_seat(), engine.winner())
+
+
+async def play_tables(catalogue):
+    server = RecordingServer(catalogue, seed=0)
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    rng = random.Random(0)
+    clients = await asyncio.gather(*[
+        play_seat('t' + str(table), 2 + table % 4,
+            make_policy('safe', random.Random(rng.getrandbits(64))),
+            catalogue, '127.0.0.1', port)
+        for table in range(TABLES) for _ in range(2 + table % 4)])
+    listener.close()
+    await listener.wait_closed()
+    return server.made, clients
+
+
+def test_clients_keep_up_with_hidden_hands():
+    """ Told only their own hands, clients still play the table's game and
+        hold the table's hand for their seat. """
+
+    tables, clients = asyncio.run(play_tables(load_catalogue()))
+    for client in clients:
+        engine = tables[client.table].engine
+        assert engine.is_terminal()
+        assert public_view(client.engine) == public_view(engine)
+        assert sorted(client.engine.hand(client.seat)) == \
+            sorted(engine.hand(client.seat))
+
+
+async def refuse_moves(catalogue):
+    server = TableServer(catalogue, seed=0)
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    first, second = TableClient(catalogue), TableClient(catalogue)
+    for client in (first, second):
+        await client.connect('127.0.0.1', port)
+        await client.join('refuse', 2)
+    await first.receive()
+    before = first.engine.key()
+    with pytest.raises(ValueError):
+        await first.place_marker(first.engine.spots())
+    refused = first.engine.key() == before and first.engine.in_setup()
+    await first.place_marker(0)
+    await second.receive()
+    await second.place_marker(20)
+    await first.receive()
+    while not first.on_move():
+        await first.receive()
+    engine = first.engine
+    tile = next(tile for tile in range(catalogue.count)
+        if tile not in engine.hand(first.seat))
+    cell = engine.placement_cells(first.seat)[0]
+    hand = engine.hand(first.seat)
+    # A client out of step with the table: it thinks it holds the tile
+    engine.reveal(first.seat, [tile])
+    moves = engine.moves()[:]
+    with pytest.raises(ValueError):
+        await first.apply_move((tile, 0, cell))
+    refused = refused and engine.moves() == moves
+    await first.apply_move((hand[0], 0, cell))
+    played = len(engine.moves()) == len(moves) + 1
+    for client in (first, second):
+        await client.close()
+    listener.close()
+    await listener.wait_closed()
+    return refused, played
+
+
+def test_refused_actions_leave_the_engine_alone():
+    """ A start spot or move the server refuses is not played on the
+        client's engine, which can go on playing. """
+
+    assert asyncio.run(refuse_moves(load_catalogue())) == (True, True)
@@ -1,25 +1,24 @@
 from arcadegraphics import *
-from constants import IMG_DIR
+from constants import IMG_DIR, CELL_LEN
 
 
 class Tile():
     """ Tile class that interactive and carries the location logic. """
 
-    def __init__(self, win, game, number, coord):
-        """ The Constructor for Tile class. """
+    def __init__(self, win, game, number, image_dir=IMG_DIR):
+        """ The Constructor for Tile class. The picture is image_dir/<n>.jpg. """
 
         self._win = win
         self._game = game
         self._id_n = number
         self._rotations = 0
-        self._coord = coord
-        self._status = "pile"
         self._clicked = False
 
-        self._image_loc = IMG_DIR + '/' + str(self._id_n) + ".jpg"
-        self._image = Image(self._win, self._image_loc, 100, 100, (-350, -350))
+        self._image_loc = image_dir + '/' + str(self._id_n) + ".jpg"
+        self._image = Image(
+            self._win, self._image_loc, CELL_LEN, CELL_LEN, (-350, -350))
         self._image.set_depth(30)
-        self._frame = Square(self._win, 100, (-350, -350))
+        self._frame = Square(self._win, CELL_LEN, (-350, -350))
         self._frame.set_fill_color("")
         self._frame.set_depth(31)
         self._frame.set_border_width(0)
@@ -27,16 +26,6 @@ class Tile():
         for element in self._tile:
             self._win.add(element)
 
-    def return_status(self):
-        """ Return the status of the tile (pile/(player#)/board). """
-
-        return self._status
-
-    def change_status(self, command_str):
-        """ Updatae the status of the tile. """
-
-        self._status = command_str
-
     def move_location(self, coord):
         """ Move the tile image to location. """
 
@@ -49,11 +38,17 @@ class Tile():
         for element in self._tile:
             element.set_depth(depth)
 
-    def return_coord(self):
-        """ Determines the orientation of the tile, then return the location
-            logic for the game. """
+    def set_rotation(self, rotation):
+        """ Turn the tile image to the given orientation (0-3). """
+
+        turns = (rotation - self._rotations) % 4
+        self._image.rotate(90 * turns)
+        self._rotations += turns
 
-        return self._coord[self._rotations % 4]
+    def return_rotation(self):
+        """ Return the orientation of the tile (0-3) for the game engine. """
+
+        return self._rotations % 4
 
     def give_handler(self):
         """ Add event handler to the tile. """
@@ -90,14 +85,13 @@ class Tile():
         return self._clicked
 
     def set_still(self):
-        """ Make the tile unclickable and update tile status to 'board'. """
+        """ Make the tile unclickable once it is placed on the board. """
 
         for element in self._tile:
             element.set_depth(36)
         self._clicked = False
         self._frame.set_border_width(0)
         self._frame.set_border_color("black")
-        self.change_status("board")
 
     def change_clicked(self):
         """ Change the status for this tile to unclicked. """
@@ -120,21 +114,11 @@ class Dragon:
 
         self._win = win
         self._game = game
-        self._status = "pile"
-        self._tile = Image(self._win, IMG_DIR + "/dragon.jpg", 100, 100, (-250, -250))
+        self._tile = Image(
+            self._win, IMG_DIR + "/dragon.jpg", CELL_LEN, CELL_LEN, (-250, -250))
         self._tile.set_depth(30)
         self._win.add(self._tile)
 
-    def return_status(self):
-        """ Return the status of the tile (pile or player#). """
-
-        return self._status
-
-    def change_status(self, command_str):
-        """ Updatae the status of the tile. """
-
-        self._status = command_str
-
     def move_location(self, coord):
         """ Move the tile image to location. """
 
@@ -44,14 +44,16 @@ class Popup:
     def report_number(self, number):
         """ Give the Game class a feedback on player counts. """
 
-        # Calls the game to make players
-        self._game.make_players(number)
+        # Calls the game to make players (or join a server table), then
+        # display the initial prompt for viewing starting tiles and
+        # choosing starting locations.
+        self._game.choose_players(number)
 
-        # Now that the popup will be removed, display the initial prompt
-        # for viewing starting tiles and choosing starting locations.
-        self._game.display_initial_view()
+        self.close()
+
+    def close(self):
+        """ Remove everything in this popup. """
 
-        # Remove everything in this popup
         for element in self._clickables:
             element.remove_it()
         for element in self._popup:
@@ -96,7 +98,7 @@ class Popupclicks():
 
 
 def winner(win, player_id):
-    """ Announce the winner. """
+    """ Announce the winner, return the shapes of the message. """
 
     # Winner message "window"
     box_winner = Rectangle(win, 400, 40, (1100, 400))
@@ -115,9 +117,11 @@ def winner(win, player_id):
     msg_winner.set_depth(1)
     win.add(msg_winner)
 
+    return [box_winner, msg_winner]
+
 
 def tie(win):
-    """ Message for a tied game. """
+    """ Message for a tied game, return its shapes. """
 
     box_tie = Rectangle(win, 300, 40, (1100, 400))
     box_tie.set_fill_color('#efe2c2')
@@ -127,3 +131,5 @@ def tie(win):
     msg_tie = Text(win, "It's a tie! No winner...", 20, (1100, 400))
     msg_tie.set_depth(1)
     win.add(msg_tie)
+
+    return [box_tie, msg_tie]
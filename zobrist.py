@@ -0,0 +1,95 @@
+import random
+
+# Random 64-bit numbers are drawn from a fixed seed so keys are the same in
+# every process (search workers, saved analyses)
+_SEED = 0x7572
+
+
+class ZobristTables:
+    """ Random numbers XORed into a position key, one per state feature. """
+
+    def __init__(self, cells, slots, tiles, seats=8):
+        """ The Constructor for ZobristTables class. """
+
+        rng = random.Random(_SEED)
+
+        def numbers(count):
+            return [rng.getrandbits(64) for _ in range(count)]
+
+        self.tiles = tiles
+        self.slots = slots
+        # cell[(cell * tiles + tile) * 4 + rotation]
+        self.cell = numbers(cells * tiles * 4)
+        # marker[seat * slots + slot]
+        self.marker = numbers(seats * slots)
+        # hand[seat * tiles + tile]
+        self.hand = numbers(seats * tiles)
+        self.dragon = numbers(seats)
+        self.turn = numbers(seats)
+
+
+# Tables already made, by board and tile set size
+_tables = {}
+
+
+def zobrist_tables(cells, slots, tiles):
+    """ Return the shared tables for a board and tile set size. """
+
+    size = (cells, slots, tiles)
+    if size not in _tables:
+        _tables[size] = ZobristTables(cells, slots, tiles)
+    return _tables[size]
+
+
+class TranspositionTable:
+    """ Fixed size table of values by position key. A slot keeps the entry
+        searched deepest; same key or a deeper entry replaces it.
+
+        Keys only tell positions of one game apart (Zobrist numbers are
+        shared by board and tile set sizes), so each entry also holds a
+        game tag, such as the tile set digest, board size and player
+        count, that a lookup must match. """
+
+    def __init__(self, bits=16):
+        """ The Constructor for TranspositionTable class. """
+
+        self._mask = (1 << bits) - 1
+        self._keys = [None] * (1 << bits)
+        self._depths = [0] * (1 << bits)
+        self._values = [None] * (1 << bits)
+        self._games = [None] * (1 << bits)
+
+    def lookup(self, key, game=None):
+        """ Return (depth, value) stored for the key in a game, or None. """
+
+        index = key & self._mask
+        if self._keys[index] == key and self._games[index] == game:
+            return self._depths[index], self._values[index]
+        return None
+
+    def store(self, key, depth, value, game=None):
+        """ Store a value unless a deeper entry for another key or game holds
+            the slot. Returns True if it was stored. """
+
+        index = key & self._mask
+        if self._keys[index] is not None and \
+            (self._keys[index] != key or self._games[index] != game) and \
+            self._depths[index] > depth:
+            return False
+        self._keys[index] = key
+        self._depths[index] = depth
+        self._values[index] = value
+        self._games[index] = game
+        return True
+
+    def clear(self):
+        """ Forget every entry. """
+
+        size = self._mask + 1
+        self._keys = [None] * size
+        self._depths = [0] * size
+        self._values = [None] * size
+        self._games = [None] * size
+
+    def __len__(self):
+        return sum(key is not None for key in self._keys)